@@ -1,7 +1,33 @@
 import discord  
 from discord import app_commands  
 from discord.ext import commands  
+from discord.webhook import async_ as webhook_async  
 import os  
+import csv  
+import gzip  
+import json  
+import time  
+import random  
+import tempfile  
+import hashlib  
+import base64  
+import secrets  
+import struct  
+import heapq  
+import mmap  
+import fcntl  
+import bisect  
+import asyncio  
+import aiohttp  
+import logging  
+import threading  
+import functools  
+import itertools  
+import contextvars  
+from array import array  
+from collections import Counter, OrderedDict, defaultdict, deque  
+from contextlib import contextmanager  
+from concurrent.futures import ThreadPoolExecutor  
 from datetime import datetime, timedelta  
 from database_py import Database  
 from config_py import Config  
@@ -9,28 +35,1779 @@ import io
   
 OWNER_ID = '1416252754925584435'  
   
-class LuarmorBot(commands.Bot):  
+PROCESS_START = time.perf_counter()  
+SEED_VERSION = 1  
+  
+log = logging.getLogger('luarmor')  
+  
+MISSING = object()  
+  
+KEY_STATUS_UNUSED = 'unused'  
+KEY_STATUS_REDEEMED = 'redeemed'  
+KEY_STATUS_EXPIRED = 'expired'  
+  
+MAX_GENERATED_KEYS = 50000  
+KEY_BATCH_SIZE = 1000  
+MAX_FILES_PER_MESSAGE = 10  
+GZIP_PART_MARGIN = 256 * 1024  
+  
+AUDIT_ACTIONS = ('whitelist', 'blacklist', 'reset_hwid', 'add_owner', 'remove_owner', 'create_key', 'generate_keys')  
+AUDIT_LENGTH = struct.Struct('<I')  
+AUDIT_HEADER = struct.Struct('<qB')  
+AUDIT_FIELD = struct.Struct('<H')  
+  
+BULK_BATCH_SIZE = 1000  
+MAX_BULK_FILE_SIZE = 25 * 1024 * 1024  
+BULK_PROGRESS_INTERVAL = 2  
+  
+INDEX_SNAPSHOT_MAGIC = b'LKX1'  
+INDEX_SNAPSHOT_HEADER = struct.Struct('<4sI')  
+INDEX_LOG_KINDS = ('keys', 'key_status', 'active', 'active_bulk')  
+INDEX_LOG_COMPACT_AFTER = 10000  
+  
+API_KEY_LENGTH = 50  
+LOGIN_ATTEMPTS_PER_MINUTE = 5  
+SESSION_CACHE_TTL = 3600  
+  
+def now_ms() -> int:  
+    return int(time.time() * 1000)  
+  
+def load_state(path: str) -> dict:  
+    try:  
+        with open(path, 'r', encoding='utf-8') as f:  
+            return json.load(f)  
+    except (FileNotFoundError, json.JSONDecodeError):  
+        return {}  
+  
+def save_state(path: str, state: dict):  
+    tmp_path = f'{path}.tmp'  
+    with open(tmp_path, 'w', encoding='utf-8') as f:  
+        json.dump(state, f, indent=2)  
+    os.replace(tmp_path, path)  
+  
+def shard_path(path: str, shard_ids) -> str:  
+    if not shard_ids:  
+        return path  
+    return f"{path}.{'-'.join(map(str, sorted(shard_ids)))}"  
+  
+def check_sharding(config, database, shard_ids):  
+    if not shard_ids:  
+        return  
+    missing = [name for name in ('SHARED_DATABASE', 'INVALIDATION_BUS_URL') if not getattr(config, name, None)]  
+    if missing:  
+        raise RuntimeError(f"SHARD_IDS runs shards in separate processes and needs a Database shared by every process "  
+                           f"(SHARED_DATABASE = True) and an invalidation bus (INVALIDATION_BUS_URL); missing: {', '.join(missing)}")  
+    if not callable(getattr(database, 'redeem_key_atomic', None)):  
+        raise RuntimeError('SHARD_IDS needs Database.redeem_key_atomic; the in-process redeem lock cannot stop two processes redeeming the same key')  
+  
+def since_start_ms() -> float:  
+    return (time.perf_counter() - PROCESS_START) * 1000  
+  
+@contextmanager  
+def startup_stage(name: str):  
+    started = time.perf_counter()  
+    yield  
+    log.info('startup stage=%s duration_ms=%.1f since_start_ms=%.1f', name, (time.perf_counter() - started) * 1000, since_start_ms())  
+  
+class TTLCache:  
+    def __init__(self, ttl: float, max_size: int = 10000):  
+        self.ttl = ttl  
+        self.max_size = max_size  
+        self.entries = OrderedDict()  
+  
+    def __len__(self) -> int:  
+        return len(self.entries)  
+  
+    def get(self, key, default=MISSING):  
+        entry = self.entries.get(key)  
+        if entry is None:  
+            return default  
+        if entry[0] < time.monotonic():  
+            del self.entries[key]  
+            return default  
+        self.entries.move_to_end(key)  
+        return entry[1]  
+  
+    def set(self, key, value):  
+        self.entries[key] = (time.monotonic() + self.ttl, value)  
+        self.entries.move_to_end(key)  
+        if len(self.entries) > self.max_size:  
+            self.entries.popitem(last=False)  
+  
+    def invalidate(self, key):  
+        self.entries.pop(key, None)  
+  
+    def clear(self):  
+        self.entries.clear()  
+  
+class TokenBucket:  
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')  
+  
+    def __init__(self, rate: float, capacity: float):  
+        self.rate = rate  
+        self.capacity = capacity  
+        self.tokens = capacity  
+        self.updated = time.monotonic()  
+  
+    def refill(self):  
+        now = time.monotonic()  
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)  
+        self.updated = now  
+  
+    def reserve(self) -> float:  
+        self.refill()  
+        self.tokens -= 1  
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate  
+  
+    def try_acquire(self) -> bool:  
+        self.refill()  
+        if self.tokens < 1:  
+            return False  
+        self.tokens -= 1  
+        return True  
+  
+def hash_api_key(api_key: str, secret: bytes) -> str:  
+    return hashlib.blake2b(api_key.encode(), key=secret, digest_size=32).hexdigest()  
+  
+class InvalidationBus:  
     def __init__(self):  
-        intents = discord.Intents.default()  
-        intents.message_content = True  
-        intents.members = True  
-        intents.guilds = True  
+        self.origin = secrets.token_hex(8)  
+        self.handler = None  
+  
+    async def start(self, handler):  
+        self.handler = handler  
+  
+    async def publish(self, message: dict):  
+        pass  
+  
+    async def close(self):  
+        pass  
+  
+class RedisInvalidationBus(InvalidationBus):  
+    def __init__(self, url: str, channel: str = 'luarmor:invalidate'):  
+        super().__init__()  
+        import redis.asyncio as redis  
+        self.redis = redis.from_url(url)  
+        self.channel = channel  
+        self.pubsub = None  
+        self.task = None  
+  
+    async def start(self, handler):  
+        self.handler = handler  
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)  
+        await self.pubsub.subscribe(self.channel)  
+        self.task = asyncio.create_task(self.listen())  
+  
+    async def listen(self):  
+        async for item in self.pubsub.listen():  
+            try:  
+                message = json.loads(item['data'])  
+                if message.get('origin') != self.origin:  
+                    await self.handler(message)  
+            except Exception:  
+                log.exception('failed to apply invalidation')  
+  
+    async def publish(self, message: dict):  
+        await self.redis.publish(self.channel, json.dumps({**message, 'origin': self.origin}))  
+  
+    async def close(self):  
+        if self.task:  
+            self.task.cancel()  
+        if self.pubsub:  
+            await self.pubsub.aclose()  
+        await self.redis.aclose()  
+  
+class ExpiryScheduler:  
+    def __init__(self, batch_size: int = 500):  
+        self.batch_size = batch_size  
+        self.heap = []  
+        self.deadlines = {}  
+        self.wakeup = asyncio.Event()  
+  
+    def __len__(self) -> int:  
+        return len(self.deadlines)  
+  
+    def load(self, entries):  
+        for kind, user_id, deadline in entries:  
+            self.deadlines[(kind, user_id)] = deadline  
+            self.heap.append((deadline, kind, user_id))  
+        heapq.heapify(self.heap)  
+        self.wakeup.set()  
+  
+    def schedule(self, kind: str, user_id: str, deadline: int):  
+        self.deadlines[(kind, user_id)] = deadline  
+        heapq.heappush(self.heap, (deadline, kind, user_id))  
+        if self.heap[0][0] == deadline:  
+            self.wakeup.set()  
+  
+    def cancel(self, kind: str, user_id: str):  
+        self.deadlines.pop((kind, user_id), None)  
+  
+    async def next_batch(self) -> list:  
+        while True:  
+            self.wakeup.clear()  
+            now = now_ms()  
+            batch = []  
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:  
+                deadline, kind, user_id = heapq.heappop(self.heap)  
+                if self.deadlines.get((kind, user_id)) == deadline:  
+                    del self.deadlines[(kind, user_id)]  
+                    batch.append((kind, user_id))  
+            if batch:  
+                return batch  
+  
+            timeout = (self.heap[0][0] - now) / 1000 if self.heap else None  
+            try:  
+                await asyncio.wait_for(self.wakeup.wait(), timeout)  
+            except asyncio.TimeoutError:  
+                pass  
   
-        super().__init__(command_prefix='/', intents=intents)  
-        self.db = Database()  
-        self.config = Config()  
+class KeyIndex:  
+    def __init__(self):  
+        self.snapshot = None  
+        self.snapshot_size = 0  
+        self.snapshot_codes = None  
+        self.snapshot_offsets = None  
+        self.snapshot_order = None  
+        self.extra_codes = []  
+        self.extra_positions = {}  
+        self.statuses = bytearray()  
+        self.durations = array('i')  
+        self.creators = array('I')  
+        self.status_names = []  
+        self.status_ids = {}  
+        self.creator_names = []  
+        self.creator_ids = {}  
+        self.by_status = {}  
+        self.by_creator = {}  
+  
+    def __len__(self) -> int:  
+        return len(self.statuses)  
+  
+    def copy(self) -> 'KeyIndex':  
+        index = KeyIndex()  
+        index.snapshot = self.snapshot  
+        index.snapshot_size = self.snapshot_size  
+        index.snapshot_codes = self.snapshot_codes  
+        index.snapshot_offsets = self.snapshot_offsets  
+        index.snapshot_order = self.snapshot_order  
+        index.extra_codes = list(self.extra_codes)  
+        index.extra_positions = dict(self.extra_positions)  
+        index.statuses = bytearray(self.statuses)  
+        index.durations = array('i', self.durations)  
+        index.creators = array('I', self.creators)  
+        index.status_names = list(self.status_names)  
+        index.status_ids = dict(self.status_ids)  
+        index.creator_names = list(self.creator_names)  
+        index.creator_ids = dict(self.creator_ids)  
+        index.by_status = {status: array('I', positions) for status, positions in self.by_status.items()}  
+        index.by_creator = {created_by: array('I', positions) for created_by, positions in self.by_creator.items()}  
+        return index  
+  
+    def load(self, keys):  
+        for key in sorted(keys, key=lambda k: k.get('createdAt') or 0):  
+            self.add(key['code'], key['status'], key.get('duration'), key.get('createdBy'))  
+  
+    def status_id(self, status: str) -> int:  
+        status_id = self.status_ids.get(status)  
+        if status_id is None:  
+            status_id = self.status_ids[status] = len(self.status_names)  
+            self.status_names.append(status)  
+            self.by_status[status] = array('I')  
+        return status_id  
+  
+    def creator_id(self, created_by: str) -> int:  
+        creator_id = self.creator_ids.get(created_by)  
+        if creator_id is None:  
+            creator_id = self.creator_ids[created_by] = len(self.creator_names)  
+            self.creator_names.append(created_by)  
+            self.by_creator[created_by] = array('I')  
+        return creator_id  
+  
+    def snapshot_code(self, position: int) -> bytes:  
+        return bytes(self.snapshot_codes[self.snapshot_offsets[position]:self.snapshot_offsets[position + 1]])  
+  
+    def code(self, position: int) -> str:  
+        if position < self.snapshot_size:  
+            return self.snapshot_code(position).decode()  
+        return self.extra_codes[position - self.snapshot_size]  
+  
+    def find(self, code: str):  
+        position = self.extra_positions.get(code)  
+        if position is not None or not self.snapshot_size:  
+            return position  
+  
+        target = code.encode()  
+        lo, hi = 0, self.snapshot_size  
+        while lo < hi:  
+            mid = (lo + hi) // 2  
+            position = self.snapshot_order[mid]  
+            value = self.snapshot_code(position)  
+            if value < target:  
+                lo = mid + 1  
+            elif value > target:  
+                hi = mid  
+            else:  
+                return position  
+        return None  
+  
+    def add(self, code: str, status: str, duration: int, created_by: str):  
+        if self.find(code) is not None:  
+            return  
+        position = len(self.statuses)  
+        self.extra_codes.append(code)  
+        self.extra_positions[code] = position  
+        self.statuses.append(self.status_id(status))  
+        self.durations.append(-1 if duration is None else duration)  
+        self.creators.append(self.creator_id(created_by))  
+        self.by_status[status].append(position)  
+        self.by_creator[created_by].append(position)  
+  
+    def set_status(self, code: str, status: str):  
+        position = self.find(code)  
+        if position is None:  
+            return  
+        positions = self.by_status[self.status_names[self.statuses[position]]]  
+        del positions[bisect.bisect_left(positions, position)]  
+        status_id = self.status_id(status)  
+        bisect.insort(self.by_status[status], position)  
+        self.statuses[position] = status_id  
+  
+    def status_counts(self) -> dict:  
+        return {status: len(positions) for status, positions in self.by_status.items() if positions}  
+  
+    def count(self, status: str = None, created_by: str = None) -> int:  
+        if created_by is None:  
+            return len(self.statuses) if status is None else len(self.by_status.get(status, ()))  
+        positions = self.by_creator.get(created_by, ())  
+        if status is None:  
+            return len(positions)  
+        status_id = self.status_ids.get(status)  
+        return sum(1 for position in positions if self.statuses[position] == status_id)  
+  
+    def page(self, status: str = None, created_by: str = None, cursor: int = None, limit: int = 25) -> dict:  
+        if created_by is not None:  
+            positions = self.by_creator.get(created_by, [])  
+        elif status is not None:  
+            positions = self.by_status.get(status, [])  
+        else:  
+            positions = range(len(self.statuses))  
+  
+        status_id = self.status_ids.get(status)  
+        keys = []  
+        last = None  
+        start = 0 if cursor is None else bisect.bisect_right(positions, cursor)  
+        for i in range(start, len(positions)):  
+            position = positions[i]  
+            if status is not None and self.statuses[position] != status_id:  
+                continue  
+            if len(keys) == limit:  
+                return {'keys': keys, 'nextCursor': last}  
+            duration = self.durations[position]  
+            keys.append({  
+                'code': self.code(position),  
+                'status': self.status_names[self.statuses[position]],  
+                'duration': None if duration < 0 else duration,  
+                'createdBy': self.creator_names[self.creators[position]]  
+            })  
+            last = position  
+        return {'keys': keys, 'nextCursor': None}  
+  
+def pack_strings(values: list) -> tuple:  
+    offsets = array('I', [0])  
+    blob = bytearray()  
+    for value in values:  
+        blob += value.encode()  
+        offsets.append(len(blob))  
+    return offsets, bytes(blob)  
+  
+def save_index_snapshot(path: str, index: KeyIndex, active_users: dict):  
+    if index.snapshot_size and not index.extra_codes:  
+        code_offsets = index.snapshot_offsets.tobytes()  
+        code_blob = index.snapshot_codes.tobytes()  
+        code_order = index.snapshot_order.tobytes()  
+    else:  
+        codes = [index.code(position) for position in range(len(index))]  
+        offsets, code_blob = pack_strings(codes)  
+        code_offsets = offsets.tobytes()  
+        code_order = array('I', sorted(range(len(codes)), key=codes.__getitem__)).tobytes()  
+    user_offsets, user_blob = pack_strings(list(active_users))  
+  
+    sections = {  
+        'statuses': bytes(index.statuses),  
+        'durations': index.durations.tobytes(),  
+        'creators': index.creators.tobytes(),  
+        'code_offsets': code_offsets,  
+        'codes': code_blob,  
+        'code_order': code_order,  
+        'user_offsets': user_offsets.tobytes(),  
+        'users': user_blob,  
+        'user_expires': array('q', active_users.values()).tobytes()  
+    }  
+    for status_id, status in enumerate(index.status_names):  
+        sections[f'status/{status_id}'] = index.by_status[status].tobytes()  
+    for creator_id, created_by in enumerate(index.creator_names):  
+        sections[f'creator/{creator_id}'] = index.by_creator[created_by].tobytes()  
+  
+    header = {  
+        'writtenAt': now_ms(),  
+        'keys': len(index),  
+        'statusNames': index.status_names,  
+        'creatorNames': index.creator_names,  
+        'sections': {}  
+    }  
+    offset = 0  
+    for name, data in sections.items():  
+        header['sections'][name] = [offset, len(data)]  
+        offset += len(data) + -len(data) % 8  
+    encoded = json.dumps(header).encode()  
+    encoded += b' ' * (-(INDEX_SNAPSHOT_HEADER.size + len(encoded)) % 8)  
+  
+    tmp_path = f'{path}.tmp'  
+    with open(tmp_path, 'wb') as f:  
+        f.write(INDEX_SNAPSHOT_HEADER.pack(INDEX_SNAPSHOT_MAGIC, len(encoded)))  
+        f.write(encoded)  
+        for data in sections.values():  
+            f.write(data)  
+            f.write(bytes(-len(data) % 8))  
+    os.replace(tmp_path, path)  
+  
+def load_index_snapshot(path: str) -> tuple:  
+    with open(path, 'rb') as f:  
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  
+    magic, header_length = INDEX_SNAPSHOT_HEADER.unpack_from(data)  
+    if magic != INDEX_SNAPSHOT_MAGIC:  
+        data.close()  
+        raise ValueError(f'{path} is not an index snapshot')  
+    base = INDEX_SNAPSHOT_HEADER.size + header_length  
+    header = json.loads(data[INDEX_SNAPSHOT_HEADER.size:base])  
+    view = memoryview(data)  
+  
+    def section(name: str) -> memoryview:  
+        offset, length = header['sections'][name]  
+        return view[base + offset:base + offset + length]  
+  
+    def column(name: str, typecode: str) -> array:  
+        values = array(typecode)  
+        values.frombytes(section(name))  
+        return values  
+  
+    index = KeyIndex()  
+    index.snapshot = data  
+    index.snapshot_size = header['keys']  
+    index.snapshot_codes = section('codes')  
+    index.snapshot_offsets = section('code_offsets').cast('I')  
+    index.snapshot_order = section('code_order').cast('I')  
+    index.statuses = bytearray(section('statuses'))  
+    index.durations = column('durations', 'i')  
+    index.creators = column('creators', 'I')  
+    index.status_names = header['statusNames']  
+    index.status_ids = {status: status_id for status_id, status in enumerate(index.status_names)}  
+    index.creator_names = header['creatorNames']  
+    index.creator_ids = {created_by: creator_id for creator_id, created_by in enumerate(index.creator_names)}  
+    index.by_status = {status: column(f'status/{status_id}', 'I') for status_id, status in enumerate(index.status_names)}  
+    index.by_creator = {created_by: column(f'creator/{creator_id}', 'I') for creator_id, created_by in enumerate(index.creator_names)}  
+  
+    user_offsets = section('user_offsets').cast('I')  
+    users = section('users')  
+    expires = column('user_expires', 'q')  
+    active_users = {bytes(users[user_offsets[i]:user_offsets[i + 1]]).decode(): expires[i] for i in range(len(expires))}  
+    return index, active_users, header['writtenAt']  
+  
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)  
+  
+current_scope = contextvars.ContextVar('current_scope', default=None)  
+  
+class Histogram:  
+    __slots__ = ('buckets', 'total', 'count')  
   
-    async def setup_hook(self):  
-        await self.tree.sync()  
+    def __init__(self):  
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  
+        self.total = 0.0  
+        self.count = 0  
+  
+    def observe(self, value: float):  
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1  
+        self.total += value  
+        self.count += 1  
+  
+class InteractionScope:  
+    __slots__ = ('db_calls', 'db_seconds', 'api_seconds')  
+  
+    def __init__(self):  
+        self.db_calls = 0  
+        self.db_seconds = 0.0  
+        self.api_seconds = 0.0  
   
-    def is_owner(self, user_id: str) -> bool:  
-        return user_id == OWNER_ID or self.db.is_owner(user_id)  
+class Metrics:  
+    def __init__(self):  
+        self.handlers = defaultdict(Histogram)  
+        self.errors = Counter()  
+        self.db_calls = Counter()  
+        self.db_seconds = Counter()  
+        self.api_seconds = Counter()  
+        self.routes = defaultdict(Histogram)  
+        self.events = Counter()  
+  
+    @contextmanager  
+    def scope(self, name: str):  
+        scope = InteractionScope()  
+        token = current_scope.set(scope)  
+        started = time.perf_counter()  
+        try:  
+            yield scope  
+        except Exception:  
+            self.errors[name] += 1  
+            raise  
+        finally:  
+            self.handlers[name].observe(time.perf_counter() - started)  
+            self.db_calls[name] += scope.db_calls  
+            self.db_seconds[name] += scope.db_seconds  
+            self.api_seconds[name] += scope.api_seconds  
+            current_scope.reset(token)  
+  
+    def instrument(self, func):  
+        name = func.__qualname__  
+  
+        @functools.wraps(func)  
+        async def wrapper(*args, **kwargs):  
+            if current_scope.get() is None:  
+                with self.scope(name):  
+                    return await func(*args, **kwargs)  
+            try:  
+                return await func(*args, **kwargs)  
+            except Exception:  
+                self.errors[name] += 1  
+                raise  
+  
+        return wrapper  
   
-    def has_manager_role(self, member: discord.Member) -> bool:  
-        if self.is_owner(str(member.id)):  
+    def timed_request(self, request):  
+        if getattr(request, 'timed', False):  
+            return request  
+  
+        async def wrapper(route, *args, **kwargs):  
+            started = time.perf_counter()  
+            try:  
+                return await request(route, *args, **kwargs)  
+            finally:  
+                self.observe_api(f'{route.method} {route.path}', time.perf_counter() - started)  
+  
+        wrapper.timed = True  
+        return wrapper  
+  
+    def observe_api(self, route: str, seconds: float):  
+        self.routes[route].observe(seconds)  
+        scope = current_scope.get()  
+        if scope is not None:  
+            scope.api_seconds += seconds  
+  
+    def render(self) -> str:  
+        lines = []  
+  
+        def histogram(metric: str, label: str, series: dict):  
+            lines.append(f'# TYPE {metric} histogram')  
+            for value, hist in sorted(series.items()):  
+                cumulative = 0  
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), hist.buckets):  
+                    cumulative += count  
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')  
+                lines.append(f'{metric}_sum{{{label}="{value}"}} {hist.total:.6f}')  
+                lines.append(f'{metric}_count{{{label}="{value}"}} {hist.count}')  
+  
+        def counter(metric: str, series: Counter):  
+            lines.append(f'# TYPE {metric} counter')  
+            for value, count in sorted(series.items()):  
+                lines.append(f'{metric}{{handler="{value}"}} {count:g}')  
+  
+        histogram('luarmor_handler_seconds', 'handler', self.handlers)  
+        counter('luarmor_handler_errors_total', self.errors)  
+        counter('luarmor_handler_db_calls_total', self.db_calls)  
+        counter('luarmor_handler_db_seconds_total', self.db_seconds)  
+        counter('luarmor_handler_api_seconds_total', self.api_seconds)  
+        histogram('luarmor_discord_api_seconds', 'route', self.routes)  
+        lines.append('# TYPE luarmor_events_total counter')  
+        for event, count in sorted(self.events.items()):  
+            lines.append(f'luarmor_events_total{{event="{event}"}} {count}')  
+        return '\n'.join(lines) + '\n'  
+  
+metrics = Metrics()  
+  
+def apply_key_message(index: KeyIndex, kind: str, key, value):  
+    if kind == 'key_status':  
+        index.set_status(key, value)  
+    elif kind == 'keys':  
+        for code in value['codes']:  
+            index.add(code, KEY_STATUS_UNUSED, value['days'], value['createdBy'])  
+  
+class AsyncDatabase:  
+    def __init__(self, db, workers: int = 1, cache_ttl: float = 30, bus: InvalidationBus = None, api_key_secret: str = None,  
+                 snapshot_path: str = None, snapshot_max_age: float = 86400):  
+        self.db = db  
+        self.snapshot_path = snapshot_path  
+        self.snapshot_max_age = snapshot_max_age  
+        self.index_log = None  
+        self.index_log_entries = 0  
+        self.index_log_pending = []  
+        self.index_log_lock = asyncio.Lock()  
+        self.index_log_flush = None  
+        self.compaction = None  
+        self.compaction_backlog = None  
+        self.bus = bus or InvalidationBus()  
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db')  
+        self.owners = TTLCache(cache_ttl)  
+        self.sessions = TTLCache(cache_ttl)  
+        self.logged_in = TTLCache(SESSION_CACHE_TTL, max_size=100000)  
+        self.inflight = {}  
+        self.redeem_lock = threading.Lock()  
+        self.login_attempts = OrderedDict()  
+        self.api_key_secret = hashlib.blake2b(api_key_secret.encode()).digest() if api_key_secret else None  
+        self.panel = TTLCache(cache_ttl)  
+        self.active_users = {}  
+        self.expiry = ExpiryScheduler()  
+        self.keys = KeyIndex()  
+        self.indexes_loaded = False  
+  
+    async def run(self, func, *args, **kwargs):  
+        loop = asyncio.get_running_loop()  
+        scope = current_scope.get()  
+        if scope is None:  
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))  
+  
+        started = time.perf_counter()  
+        try:  
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))  
+        finally:  
+            scope.db_calls += 1  
+            scope.db_seconds += time.perf_counter() - started  
+  
+    def __getattr__(self, name):  
+        attr = getattr(self.db, name)  
+        if not callable(attr):  
+            return attr  
+  
+        async def call(*args, **kwargs):  
+            return await self.run(attr, *args, **kwargs)  
+  
+        call.__name__ = name  
+        self.__dict__[name] = call  
+        return call  
+  
+    async def broadcast(self, kind: str, key=None, value=None):  
+        message = {'kind': kind, 'key': key, 'value': value}  
+        self.apply(message)  
+        try:  
+            await self.bus.publish(message)  
+        except Exception:  
+            log.exception('failed to publish invalidation kind=%s', kind)  
+  
+    def apply(self, message: dict):  
+        kind, key, value = message['kind'], message.get('key'), message.get('value')  
+        if self.index_log and kind in INDEX_LOG_KINDS:  
+            self.log_index_message({'kind': kind, 'key': key, 'value': value})  
+        if kind == 'owners':  
+            self.owners.invalidate(key)  
+        elif kind == 'sessions':  
+            self.sessions.invalidate(key)  
+            self.logged_in.invalidate(key)  
+        elif kind == 'panel':  
+            self.panel.clear()  
+        elif kind == 'active':  
+            if value:  
+                self.set_active(key, value)  
+            else:  
+                self.active_users.pop(key, None)  
+        elif kind == 'active_bulk':  
+            for user_id, expires_at in value:  
+                if expires_at:  
+                    self.set_active(user_id, expires_at)  
+                else:  
+                    self.active_users.pop(user_id, None)  
+        elif kind in ('key_status', 'keys'):  
+            apply_key_message(self.keys, kind, key, value)  
+  
+    def log_index_message(self, message: dict):  
+        self.index_log_pending.append(json.dumps(message).encode() + b'\n')  
+        self.index_log_entries += 1  
+        if self.compaction_backlog is not None:  
+            self.compaction_backlog.append(message)  
+        if self.index_log_flush is None or self.index_log_flush.done():  
+            self.index_log_flush = asyncio.create_task(self.flush_index_log())  
+        if self.compaction is None and self.index_log_entries >= INDEX_LOG_COMPACT_AFTER:  
+            self.compaction = asyncio.create_task(self.compact_index_log())  
+  
+    async def flush_index_log(self):  
+        async with self.index_log_lock:  
+            await self.write_index_log()  
+  
+    async def write_index_log(self):  
+        loop = asyncio.get_running_loop()  
+        while self.index_log_pending:  
+            lines, self.index_log_pending = self.index_log_pending, []  
+            await loop.run_in_executor(self.executor, self.append_index_log, lines)  
+  
+    def append_index_log(self, lines: list):  
+        self.index_log.writelines(lines)  
+        self.index_log.flush()  
+  
+    async def compact_index_log(self):  
+        loop = asyncio.get_running_loop()  
+        try:  
+            async with self.index_log_lock:  
+                await self.write_index_log()  
+                offset = self.index_log.tell()  
+                keys, active_users = self.keys.copy(), dict(self.active_users)  
+                backlog = self.compaction_backlog = []  
+                self.index_log_entries = 0  
+  
+            keys = await loop.run_in_executor(self.executor, self.write_snapshot, keys, active_users)  
+            async with self.index_log_lock:  
+                await self.write_index_log()  
+                self.index_log = await loop.run_in_executor(self.executor, self.trim_index_log, offset)  
+            for message in backlog:  
+                apply_key_message(keys, message['kind'], message.get('key'), message.get('value'))  
+            self.keys = keys  
+        except Exception:  
+            log.exception('failed to compact index snapshot path=%s', self.snapshot_path)  
+        finally:  
+            self.compaction_backlog = None  
+            self.compaction = None  
+  
+    def write_snapshot(self, keys: KeyIndex, active_users: dict) -> KeyIndex:  
+        save_index_snapshot(self.snapshot_path, keys, active_users)  
+        keys, _, _ = load_index_snapshot(self.snapshot_path)  
+        return keys  
+  
+    def trim_index_log(self, offset: int):  
+        path = f'{self.snapshot_path}.log'  
+        self.index_log.close()  
+        with open(path, 'rb') as f:  
+            f.seek(offset)  
+            tail = f.read()  
+        with open(f'{path}.tmp', 'wb') as f:  
+            f.write(tail)  
+        os.replace(f'{path}.tmp', path)  
+        return open(path, 'ab')  
+  
+    async def single_flight(self, key, func, *args):  
+        task = self.inflight.get(key)  
+        if task is None:  
+            task = self.inflight[key] = asyncio.create_task(func(*args))  
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))  
+        return await asyncio.shield(task)  
+  
+    async def cached(self, cache: TTLCache, key, func, *args):  
+        value = cache.get(key)  
+        if value is MISSING:  
+            value = await self.run(func, *args)  
+            cache.set(key, value)  
+        return value  
+  
+    async def is_owner(self, user_id: str) -> bool:  
+        return await self.cached(self.owners, user_id, self.db.is_owner, user_id)  
+  
+    async def is_logged_in(self, user_id: str) -> bool:  
+        if self.logged_in.get(user_id, False):  
             return True  
+        if not await self.cached(self.sessions, user_id, self.db.is_logged_in, user_id):  
+            return False  
+        self.logged_in.set(user_id, True)  
+        return True  
+  
+    async def get_panel_config(self):  
+        return await self.cached(self.panel, None, self.db.get_panel_config)  
+  
+    async def get_user_status(self, user_id: str) -> dict:  
+        projection = getattr(self.db, 'get_user_status', None)  
+        if projection:  
+            status = await self.run(projection, user_id)  
+        else:  
+            status = await self.run(self._user_status, user_id, not self.indexes_loaded)  
+        if status['active'] is None:  
+            status['active'] = bool(status['user']) and not status['blacklist'] and self.active_users.get(user_id, 0) > now_ms()  
+        self.schedule_unblacklist(user_id, status['blacklist'])  
+        return status  
+  
+    def _user_status(self, user_id: str, check_active: bool) -> dict:  
+        user = self.db.get_user(user_id)  
+        return {  
+            'user': user,  
+            'active': bool(user) and self.db.is_user_active(user_id) if check_active else None,  
+            'blacklist': self.db.get_blacklist_info(user_id),  
+            'key': self.db.get_key_for_user(user_id) if user else None  
+        }  
+  
+    async def add_owner(self, user_id: str, *args):  
+        result = await self.run(self.db.add_owner, user_id, *args)  
+        await self.broadcast('owners', user_id)  
+        return result  
+  
+    async def remove_owner(self, user_id: str, *args):  
+        result = await self.run(self.db.remove_owner, user_id, *args)  
+        await self.broadcast('owners', user_id)  
+        return result  
+  
+    def login_bucket(self, user_id: str) -> TokenBucket:  
+        bucket = self.login_attempts.get(user_id)  
+        if bucket is None:  
+            bucket = self.login_attempts[user_id] = TokenBucket(LOGIN_ATTEMPTS_PER_MINUTE / 60, LOGIN_ATTEMPTS_PER_MINUTE)  
+            if len(self.login_attempts) > 10000:  
+                self.login_attempts.popitem(last=False)  
+        else:  
+            self.login_attempts.move_to_end(user_id)  
+        return bucket  
+  
+    async def create_api_key(self, created_by: str, user_id: str):  
+        store = getattr(self.db, 'create_api_key_hash', None)  
+        if not store or not self.api_key_secret:  
+            return await self.run(self.db.create_api_key, created_by, user_id)  
+  
+        api_key = secrets.token_urlsafe(API_KEY_LENGTH)[:API_KEY_LENGTH]  
+        result = await self.run(store, created_by, user_id, hash_api_key(api_key, self.api_key_secret))  
+        if result['success']:  
+            result['apiKey'] = {**result.get('apiKey', {}), 'apiKey': api_key}  
+        return result  
+  
+    async def login_with_api_key(self, user_id: str, username: str, api_key: str):  
+        if len(api_key) != API_KEY_LENGTH:  
+            return {'success': False, 'error': 'Invalid API key'}  
+        if not self.login_bucket(user_id).try_acquire():  
+            return {'success': False, 'error': 'Too many login attempts. Please try again later.'}  
+  
+        verify = getattr(self.db, 'login_with_api_key_hash', None)  
+        if verify and self.api_key_secret:  
+            result = await self.run(self._login_hashed, verify, user_id, username, api_key)  
+        else:  
+            result = await self.run(self.db.login_with_api_key, user_id, username, api_key)  
+        if result['success']:  
+            await self.broadcast('sessions', user_id)  
+        return result  
+  
+    def _login_hashed(self, verify, user_id: str, username: str, api_key: str):  
+        api_key_hash = hash_api_key(api_key, self.api_key_secret)  
+        result = verify(user_id, username, api_key_hash)  
+        if result['success']:  
+            return result  
+        legacy = self.db.login_with_api_key(user_id, username, api_key)  
+        if not legacy['success']:  
+            return result  
+        try:  
+            self.db.create_api_key_hash('migration', user_id, api_key_hash)  
+        except Exception:  
+            log.exception('failed to migrate api key to a hash user_id=%s', user_id)  
+        return legacy  
+  
+    async def redeem_key(self, user_id: str, username: str, code: str):  
+        return await self.single_flight(('redeem', user_id, code), self._redeem_key, user_id, username, code)  
+  
+    async def _redeem_key(self, user_id: str, username: str, code: str):  
+        redeem = getattr(self.db, 'redeem_key_atomic', None) or self._redeem  
+        result = await self.run(redeem, user_id, username, code)  
+        if result['success']:  
+            await self.broadcast('sessions', user_id)  
+            await self.broadcast('key_status', code, KEY_STATUS_REDEEMED)  
+            await self.broadcast('active', user_id, result['user']['expiresAt'])  
+        return result  
+  
+    def _redeem(self, user_id: str, username: str, code: str):  
+        with self.redeem_lock:  
+            if self.db.get_user(user_id) and (self.db.is_user_active(user_id) or self.db.is_blacklisted(user_id)):  
+                return {'success': False, 'error': 'You already have an active session. Please wait for it to expire or contact an admin.'}  
+            result = self.db.redeem_key(user_id, username, code)  
+            if result['success']:  
+                result = {**result, 'user': self.db.get_user(user_id)}  
+            return result  
+  
+    async def whitelist_user(self, user_id: str, *args):  
+        result, user = await self.run(self._write_user, self.db.whitelist_user, user_id, *args)  
+        if result['success']:  
+            await self.broadcast('active', user_id, user['expiresAt'])  
+        return result  
+  
+    async def blacklist_user(self, user_id: str, *args):  
+        result, info = await self.run(self._blacklist, user_id, *args)  
+        await self.broadcast('active', user_id)  
+        self.schedule_unblacklist(user_id, info)  
+        return result  
+  
+    async def whitelist_users_bulk(self, rows: list) -> list:  
+        bulk = getattr(self.db, 'whitelist_users_bulk', None)  
+        results = await self.run(bulk or self._whitelist_bulk, rows)  
+        active = [[row[0], result['user']['expiresAt']] for row, result in zip(rows, results) if result['success']]  
+        if active:  
+            await self.broadcast('active_bulk', value=active)  
+        return results  
+  
+    async def blacklist_users_bulk(self, rows: list) -> list:  
+        bulk = getattr(self.db, 'blacklist_users_bulk', None)  
+        results = await self.run(bulk or self._blacklist_bulk, rows)  
+        blacklisted = [(row[0], result.get('blacklist')) for row, result in zip(rows, results) if result['success']]  
+        if blacklisted:  
+            await self.broadcast('active_bulk', value=[[user_id, None] for user_id, _ in blacklisted])  
+        for user_id, info in blacklisted:  
+            self.schedule_unblacklist(user_id, info)  
+        return results  
+  
+    def _whitelist_bulk(self, rows: list) -> list:  
+        results = []  
+        for row in rows:  
+            result, user = self._write_user(self.db.whitelist_user, *row)  
+            results.append({**result, 'user': user} if result['success'] else result)  
+        return results  
+  
+    def _blacklist_bulk(self, rows: list) -> list:  
+        results = []  
+        for row in rows:  
+            result, info = self._blacklist(*row)  
+            results.append({**result, 'blacklist': info} if result['success'] else result)  
+        return results  
+  
+    async def get_blacklist_info(self, user_id: str):  
+        info = await self.run(self.db.get_blacklist_info, user_id)  
+        self.schedule_unblacklist(user_id, info)  
+        return info  
+  
+    def _write_user(self, func, user_id: str, *args):  
+        result = func(user_id, *args)  
+        return result, self.db.get_user(user_id) if result['success'] else None  
+  
+    def _blacklist(self, user_id: str, *args):  
+        return self.db.blacklist_user(user_id, *args), self.db.get_blacklist_info(user_id)  
+  
+    def set_active(self, user_id: str, expires_at: int):  
+        self.active_users[user_id] = expires_at  
+        self.expiry.schedule('whitelist', user_id, expires_at)  
+  
+    def schedule_unblacklist(self, user_id: str, info):  
+        if info and not info['permanent'] and ('blacklist', user_id) not in self.expiry.deadlines:  
+            self.expiry.schedule('blacklist', user_id, info['unblacklistAt'])  
+  
+    async def expire(self, batch: list) -> list:  
+        states = await self.run(self._expire, batch)  
+        lapsed = []  
+        for kind, user_id, user, key in states:  
+            if user is not None:  
+                self.set_active(user_id, user['expiresAt'])  
+                continue  
+            self.active_users.pop(user_id, None)  
+            if kind == 'whitelist':  
+                lapsed.append(user_id)  
+                await self.broadcast('sessions', user_id)  
+            if key:  
+                await self.broadcast('key_status', key, KEY_STATUS_EXPIRED)  
+        return lapsed  
+  
+    def _expire(self, batch: list) -> list:  
+        states = []  
+        for kind, user_id in batch:  
+            if kind == 'blacklist':  
+                self.db.is_blacklisted(user_id)  
+            active = self.db.is_user_active(user_id)  
+            key = self.db.get_key_for_user(user_id) if kind == 'whitelist' and not active else None  
+            states.append((kind, user_id, self.db.get_user(user_id) if active else None, key))  
+        return states  
+  
+    async def create_key(self, code: str, days: int, created_by: str):  
+        result = await self.run(self.db.create_key, code, days, created_by)  
+        if result['success']:  
+            await self.broadcast('keys', value={'codes': [code], 'days': days, 'createdBy': created_by})  
+        return result  
+  
+    async def load_indexes(self):  
+        if self.indexes_loaded:  
+            return  
+        snapshot = await self.run(self.read_snapshot) if self.snapshot_path else None  
+        if snapshot:  
+            self.keys, self.active_users, messages = snapshot  
+            for message in messages:  
+                self.apply(message)  
+            self.index_log_entries = len(messages)  
+            log.info('loaded index snapshot keys=%d users=%d replayed=%d', len(self.keys), len(self.active_users), len(messages))  
+        else:  
+            keys, active_users = await self.run(lambda: (self.db.get_all_keys(), self.db.get_all_active_users()))  
+            self.keys.load(keys)  
+            self.active_users = {user['userId']: user['expiresAt'] for user in active_users}  
+        self.expiry.load(('whitelist', user_id, expires_at) for user_id, expires_at in self.active_users.items())  
+        self.indexes_loaded = True  
+  
+        if self.snapshot_path:  
+            if not snapshot or self.index_log_entries >= INDEX_LOG_COMPACT_AFTER:  
+                await self.run(self.save_snapshot)  
+            else:  
+                self.index_log = open(f'{self.snapshot_path}.log', 'ab')  
+  
+    def read_snapshot(self):  
+        try:  
+            keys, active_users, written_at = load_index_snapshot(self.snapshot_path)  
+        except FileNotFoundError:  
+            return None  
+        except (ValueError, KeyError, struct.error):  
+            log.exception('discarding unreadable index snapshot path=%s', self.snapshot_path)  
+            return None  
+        if now_ms() - written_at > self.snapshot_max_age * 1000:  
+            log.info('index snapshot is stale path=%s', self.snapshot_path)  
+            return None  
+  
+        messages = []  
+        try:  
+            with open(f'{self.snapshot_path}.log', 'r', encoding='utf-8') as f:  
+                for line in f:  
+                    try:  
+                        messages.append(json.loads(line))  
+                    except json.JSONDecodeError:  
+                        break  
+        except FileNotFoundError:  
+            pass  
+        return keys, active_users, messages  
+  
+    def save_snapshot(self):  
+        save_index_snapshot(self.snapshot_path, self.keys, self.active_users)  
+        if self.index_log:  
+            self.index_log.close()  
+        self.index_log = open(f'{self.snapshot_path}.log', 'wb')  
+        self.index_log_entries = 0  
+        self.index_log_pending = []  
+  
+    async def get_stats_summary(self) -> dict:  
+        await self.load_indexes()  
+        return {  
+            'activeUsers': len(self.active_users),  
+            'totalKeys': self.keys.count(),  
+            'keysByStatus': self.keys.status_counts()  
+        }  
+  
+    async def count_keys(self, status: str = None, created_by: str = None) -> int:  
+        await self.load_indexes()  
+        return self.keys.count(status, created_by)  
+  
+    async def get_keys_page(self, status: str = None, created_by: str = None, cursor: int = None, limit: int = 25) -> dict:  
+        await self.load_indexes()  
+        return self.keys.page(status, created_by, cursor, limit)  
+  
+    async def set_panel_config(self, *args):  
+        result = await self.run(self.db.set_panel_config, *args)  
+        await self.broadcast('panel')  
+        return result  
+  
+    async def set_panel_message_id(self, *args):  
+        result = await self.run(self.db.set_panel_message_id, *args)  
+        await self.broadcast('panel')  
+        return result  
+  
+    async def create_keys_bulk(self, codes, days: int, created_by: str) -> list:  
+        bulk = getattr(self.db, 'create_keys_bulk', None)  
+        created = await self.run(bulk or self._create_keys, codes, days, created_by)  
+        if created:  
+            await self.broadcast('keys', value={'codes': created, 'days': days, 'createdBy': created_by})  
+        return created  
+  
+    def _create_keys(self, codes, days: int, created_by: str) -> list:  
+        return [code for code in codes if self.db.create_key(code, days, created_by)['success']]  
+  
+    def close(self):  
+        self.executor.shutdown(wait=True)  
+        if self.index_log:  
+            self.save_snapshot()  
+            self.index_log.close()  
+  
+class AuthContext:  
+    __slots__ = ('user_id', 'is_owner', 'is_logged_in', 'user', 'is_active', 'blacklist', 'key', 'loaded')  
+  
+    def __init__(self, user_id: str, is_owner: bool, is_logged_in: bool):  
+        self.user_id = user_id  
+        self.is_owner = is_owner  
+        self.is_logged_in = is_logged_in  
+        self.user = None  
+        self.is_active = False  
+        self.blacklist = None  
+        self.key = None  
+        self.loaded = False  
+  
+    @property  
+    def is_guest(self) -> bool:  
+        return not self.is_logged_in and not self.is_owner  
+  
+    @property  
+    def is_whitelisted(self) -> bool:  
+        return bool(self.user) and self.is_active  
+  
+def generate_key_codes(amount: int) -> list:  
+    codes = set()  
+    while len(codes) < amount:  
+        missing = amount - len(codes)  
+        raw = base64.b32encode(secrets.token_bytes(10 * missing)).decode()  
+        codes.update(f"KEY-{raw[i:i + 8]}-{raw[i + 8:i + 16]}" for i in range(0, 16 * missing, 16))  
+    return list(codes)  
+  
+class ScriptTemplate:  
+    __slots__ = ('segments', 'size')  
+  
+    def __init__(self, source: str, placeholder: str = '{{KEY}}'):  
+        self.segments = [segment.encode() for segment in source.split(placeholder)]  
+        self.size = sum(len(segment) for segment in self.segments)  
+  
+    def render(self, key: str) -> bytes:  
+        return key.encode().join(self.segments)  
+  
+class ScriptCache:  
+    def __init__(self, fallback: str, max_bytes: int = 64 * 1024 * 1024):  
+        self.fallback = fallback  
+        self.max_bytes = max_bytes  
+        self.template = ScriptTemplate(fallback)  
+        self.rendered = OrderedDict()  
+        self.rendered_bytes = 0  
+  
+    def set_source(self, source: str):  
+        self.template = ScriptTemplate(source or self.fallback)  
+        self.rendered.clear()  
+        self.rendered_bytes = 0  
+  
+    def invalidate(self, user_id: str):  
+        entry = self.rendered.pop(user_id, None)  
+        if entry:  
+            self.rendered_bytes -= len(entry[1])  
+  
+    def render(self, user_id: str, key: str) -> bytes:  
+        entry = self.rendered.get(user_id)  
+        if entry and entry[0] == key:  
+            self.rendered.move_to_end(user_id)  
+            return entry[1]  
+  
+        self.invalidate(user_id)  
+        payload = self.template.render(key)  
+        self.rendered[user_id] = (key, payload)  
+        self.rendered_bytes += len(payload)  
+        while self.rendered_bytes > self.max_bytes and len(self.rendered) > 1:  
+            _, (_, evicted) = self.rendered.popitem(last=False)  
+            self.rendered_bytes -= len(evicted)  
+        return payload  
+  
+class KeyFileWriter:  
+    def __init__(self, filename: str, limit: int, spool_size: int = 1024 * 1024):  
+        self.filename = filename  
+        self.limit = limit  
+        self.spool_size = spool_size  
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=spool_size)  
+        self.parts = []  
+        self.attachments = None  
+        self.count = 0  
+  
+    def write(self, code: str):  
+        self.buffer.write(code.encode() + b'\n')  
+        self.count += 1  
+  
+    def prepare(self) -> list:  
+        if self.attachments is not None:  
+            return self.attachments  
+  
+        size = self.buffer.tell()  
+        self.buffer.seek(0)  
+        if size <= self.limit:  
+            self.attachments = [(self.buffer, f'{self.filename}.txt')]  
+            return self.attachments  
+  
+        self.compress()  
+        if len(self.parts) == 1:  
+            self.attachments = [(self.parts[0], f'{self.filename}.txt.gz')]  
+        else:  
+            self.attachments = [(part, f'{self.filename}-part{i}.txt.gz') for i, part in enumerate(self.parts, 1)]  
+        return self.attachments  
+  
+    def files(self) -> list:  
+        files = []  
+        for fp, filename in self.prepare():  
+            fp.seek(0)  
+            files.append(discord.File(fp, filename=filename))  
+        return files  
+  
+    def compress(self):  
+        threshold = self.limit - min(GZIP_PART_MARGIN, self.limit // 4)  
+        part = None  
+        for line in self.buffer:  
+            if part is None:  
+                part = tempfile.SpooledTemporaryFile(max_size=self.spool_size)  
+                self.parts.append(part)  
+                writer = gzip.GzipFile(fileobj=part, mode='wb')  
+            writer.write(line)  
+            if part.tell() >= threshold:  
+                writer.close()  
+                part.seek(0)  
+                part = None  
+        if part is not None:  
+            writer.close()  
+            part.seek(0)  
+  
+    def close(self):  
+        self.buffer.close()  
+        for part in self.parts:  
+            part.close()  
+  
+class DMJob:  
+    __slots__ = ('user', 'build', 'report', 'attempts', 'sent')  
+  
+    def __init__(self, user: discord.abc.User, build, report):  
+        self.user = user  
+        self.build = build  
+        self.report = report  
+        self.attempts = 0  
+        self.sent = 0  
+  
+class DMDispatcher:  
+    def __init__(self, workers: int = 4, max_queue: int = 1000, rate: float = 5.0, burst: float = 10,  
+                 user_rate: float = 1.0, user_burst: float = 3, max_attempts: int = 4, max_routes: int = 10000):  
+        self.workers = workers  
+        self.queue = asyncio.Queue(maxsize=max_queue)  
+        self.global_bucket = TokenBucket(rate, burst)  
+        self.user_rate = user_rate  
+        self.user_burst = user_burst  
+        self.max_attempts = max_attempts  
+        self.max_routes = max_routes  
+        self.routes = OrderedDict()  
+        self.dead_letters = deque(maxlen=100)  
+        self.tasks = []  
+  
+    def start(self):  
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]  
+  
+    async def stop(self):  
+        for task in self.tasks:  
+            task.cancel()  
+        await asyncio.gather(*self.tasks, return_exceptions=True)  
+  
+    async def submit(self, user: discord.abc.User, build, report=None):  
+        job = DMJob(user, build, report)  
+        try:  
+            self.queue.put_nowait(job)  
+        except asyncio.QueueFull:  
+            await self.dead_letter(job, 'queue full')  
+            return  
+        metrics.events['dm_queued'] += 1  
+  
+    def route_bucket(self, user_id: int) -> TokenBucket:  
+        bucket = self.routes.get(user_id)  
+        if bucket is None:  
+            bucket = self.routes[user_id] = TokenBucket(self.user_rate, self.user_burst)  
+            if len(self.routes) > self.max_routes:  
+                self.routes.popitem(last=False)  
+        else:  
+            self.routes.move_to_end(user_id)  
+        return bucket  
+  
+    async def worker(self):  
+        while True:  
+            job = await self.queue.get()  
+            try:  
+                await self.deliver(job)  
+            finally:  
+                self.queue.task_done()  
+  
+    async def deliver(self, job: DMJob):  
+        while True:  
+            delay = max(self.route_bucket(job.user.id).reserve(), self.global_bucket.reserve())  
+            if delay:  
+                await asyncio.sleep(delay)  
+  
+            job.attempts += 1  
+            try:  
+                for message in itertools.islice(job.build(), job.sent, None):  
+                    await job.user.send(**message)  
+                    job.sent += 1  
+            except discord.Forbidden as e:  
+                await self.dead_letter(job, e)  
+                return  
+            except (discord.HTTPException, asyncio.TimeoutError, OSError) as e:  
+                if job.attempts >= self.max_attempts:  
+                    await self.dead_letter(job, e)  
+                    return  
+                metrics.events['dm_retried'] += 1  
+                await asyncio.sleep(min(2 ** job.attempts, 30) + random.uniform(0, 0.5))  
+            except Exception as e:  
+                log.exception('unexpected error sending dm user_id=%s', job.user.id)  
+                await self.dead_letter(job, e)  
+                return  
+            else:  
+                metrics.events['dm_delivered'] += 1  
+                await self.finish(job, True)  
+                return  
   
-        panel_config = self.db.get_panel_config()  
+    async def dead_letter(self, job: DMJob, error):  
+        metrics.events['dm_dead_letter'] += 1  
+        self.dead_letters.append({'userId': str(job.user.id), 'attempts': job.attempts, 'error': str(error), 'at': now_ms()})  
+        log.warning('dm dead letter user_id=%s attempts=%d error=%s', job.user.id, job.attempts, error)  
+        await self.finish(job, False)  
+  
+    async def finish(self, job: DMJob, delivered: bool):  
+        if job.report is None:  
+            return  
+        try:  
+            await job.report(delivered)  
+        except Exception:  
+            log.exception('failed to report dm delivery user_id=%s', job.user.id)  
+  
+def encode_audit_record(at: int, action: str, actor: str, target: str, detail: str) -> bytes:  
+    fields = [value.encode()[:0xffff] for value in (actor, target, detail)]  
+    body = AUDIT_HEADER.pack(at, AUDIT_ACTIONS.index(action)) + b''.join(AUDIT_FIELD.pack(len(field)) + field for field in fields)  
+    return AUDIT_LENGTH.pack(len(body)) + body  
+  
+def decode_audit_record(body: bytes) -> dict:  
+    at, action = AUDIT_HEADER.unpack_from(body)  
+    position = AUDIT_HEADER.size  
+    fields = []  
+    for _ in range(3):  
+        (length,) = AUDIT_FIELD.unpack_from(body, position)  
+        position += AUDIT_FIELD.size  
+        fields.append(body[position:position + length].decode(errors='replace'))  
+        position += length  
+    return {'at': at, 'action': AUDIT_ACTIONS[action], 'actor': fields[0], 'target': fields[1], 'detail': fields[2]}  
+  
+class AuditJournal:  
+    def __init__(self, path: str, flush_interval: float = 0.005):  
+        self.path = path  
+        self.flush_interval = flush_interval  
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit')  
+        self.file = None  
+        self.size = 0  
+        self.index = defaultdict(list)  
+        self.pending = []  
+        self.wakeup = asyncio.Event()  
+        self.lock = asyncio.Lock()  
+        self.closing = False  
+        self.task = None  
+  
+    async def start(self):  
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.load)  
+        self.task = asyncio.create_task(self.writer())  
+  
+    def load(self):  
+        self.file = open(self.path, 'a+b')  
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)  
+        try:  
+            entries, offset = self.scan(0)  
+            if os.fstat(self.file.fileno()).st_size != offset:  
+                log.warning('truncating torn audit journal tail at offset=%d', offset)  
+                self.file.truncate(offset)  
+        finally:  
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)  
+        for entry in entries:  
+            self.add_to_index(*entry)  
+        self.size = offset  
+  
+    def scan(self, offset: int, end: int = None) -> tuple:  
+        entries = []  
+        with open(self.file.fileno(), 'rb', closefd=False) as f:  
+            f.seek(offset)  
+            while end is None or offset < end:  
+                header = f.read(AUDIT_LENGTH.size)  
+                if len(header) < AUDIT_LENGTH.size:  
+                    break  
+                (length,) = AUDIT_LENGTH.unpack(header)  
+                body = f.read(length)  
+                if len(body) < length:  
+                    break  
+                record = decode_audit_record(body)  
+                entries.append((offset, record['actor'], record['target']))  
+                offset += AUDIT_LENGTH.size + length  
+        return entries, offset  
+  
+    def add_to_index(self, offset: int, actor: str, target: str):  
+        self.index[actor].append(offset)  
+        if target and target != actor:  
+            self.index[target].append(offset)  
+  
+    async def append(self, action: str, actor, target='', detail: str = '') -> bool:  
+        if self.task is None or self.task.done():  
+            return False  
+        future = asyncio.get_running_loop().create_future()  
+        actor, target = str(actor), str(target)  
+        self.pending.append((encode_audit_record(now_ms(), action, actor, target, detail), actor, target, future))  
+        self.wakeup.set()  
+        return await future  
+  
+    async def writer(self):  
+        loop = asyncio.get_running_loop()  
+        while self.pending or not self.closing:  
+            await self.wakeup.wait()  
+            if not self.closing:  
+                await asyncio.sleep(self.flush_interval)  
+            self.wakeup.clear()  
+            batch, self.pending = self.pending, []  
+            if not batch:  
+                continue  
+            async with self.lock:  
+                try:  
+                    foreign, offset = await loop.run_in_executor(self.executor, self.write, [record for record, _, _, _ in batch])  
+                except Exception:  
+                    log.exception('failed to write audit batch size=%d', len(batch))  
+                    for _, _, _, future in batch:  
+                        future.set_result(False)  
+                    continue  
+                for entry in foreign:  
+                    self.add_to_index(*entry)  
+                for record, actor, target, future in batch:  
+                    self.add_to_index(offset, actor, target)  
+                    offset += len(record)  
+                    future.set_result(True)  
+                self.size = offset  
+  
+    def write(self, records: list) -> tuple:  
+        data = b''.join(records)  
+        fd = self.file.fileno()  
+        fcntl.flock(fd, fcntl.LOCK_EX)  
+        try:  
+            start = os.fstat(fd).st_size  
+            if os.write(fd, data) != len(data):  
+                os.ftruncate(fd, start)  
+                raise OSError(f'short write to audit journal at offset={start}')  
+            os.fsync(fd)  
+        finally:  
+            fcntl.flock(fd, fcntl.LOCK_UN)  
+        foreign, _ = self.scan(self.size, start)  
+        return foreign, start  
+  
+    async def history(self, user_id, limit: int = 20) -> list:  
+        loop = asyncio.get_running_loop()  
+        async with self.lock:  
+            entries, self.size = await loop.run_in_executor(self.executor, self.scan, self.size)  
+            for entry in entries:  
+                self.add_to_index(*entry)  
+        offsets = self.index.get(str(user_id), [])[-limit:]  
+        return await loop.run_in_executor(self.executor, self.read, offsets[::-1])  
+  
+    def read(self, offsets: list) -> list:  
+        records = []  
+        for offset in offsets:  
+            (length,) = AUDIT_LENGTH.unpack(os.pread(self.file.fileno(), AUDIT_LENGTH.size, offset))  
+            records.append(decode_audit_record(os.pread(self.file.fileno(), length, offset + AUDIT_LENGTH.size)))  
+        return records  
+  
+    async def close(self):  
+        self.closing = True  
+        self.wakeup.set()  
+        if self.task:  
+            await asyncio.gather(self.task, return_exceptions=True)  
+        if self.file:  
+            self.file.close()  
+        self.executor.shutdown(wait=True)  
+  
+class RoleReconciler:  
+    def __init__(self, bot: commands.Bot, workers: int = 4, rate: float = 5.0, interval: float = 300, list_interval: float = 3600):  
+        self.bot = bot  
+        self.workers = workers  
+        self.interval = interval  
+        self.list_interval = list_interval  
+        self.listed_at = {}  
+        self.can_list_members = True  
+        self.bucket = TokenBucket(rate, rate)  
+        self.queue = asyncio.Queue()  
+        self.pending = set()  
+        self.tasks = []  
+  
+    def start(self):  
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]  
+        self.tasks.append(asyncio.create_task(self.reconcile_loop()))  
+  
+    async def stop(self):  
+        for task in self.tasks:  
+            task.cancel()  
+        await asyncio.gather(*self.tasks, return_exceptions=True)  
+  
+    def enqueue(self, op: str, guild_id: int, role_id: int, user_id: int):  
+        item = (op, guild_id, role_id, user_id)  
+        if item in self.pending:  
+            return  
+        self.pending.add(item)  
+        self.queue.put_nowait(item)  
+  
+    async def worker(self):  
+        while True:  
+            item = await self.queue.get()  
+            op, guild_id, role_id, user_id = item  
+            try:  
+                delay = self.bucket.reserve()  
+                if delay:  
+                    await asyncio.sleep(delay)  
+                if op == 'add':  
+                    await self.bot.http.add_role(guild_id, user_id, role_id, reason='Whitelist active')  
+                else:  
+                    await self.bot.http.remove_role(guild_id, user_id, role_id, reason='Whitelist expired')  
+                metrics.events[f'buyer_role_{op}'] += 1  
+            except discord.HTTPException as e:  
+                log.warning('failed to %s buyer role guild_id=%s user_id=%s error=%s', op, guild_id, user_id, e)  
+            except Exception:  
+                log.exception('failed to %s buyer role guild_id=%s user_id=%s', op, guild_id, user_id)  
+            finally:  
+                self.pending.discard(item)  
+                self.queue.task_done()  
+  
+    async def reconcile_loop(self):  
+        await self.bot.wait_until_ready()  
+        while not self.bot.is_closed():  
+            for guild in self.bot.guilds:  
+                try:  
+                    await self.reconcile(guild)  
+                except Exception:  
+                    log.exception('failed to reconcile buyer role guild_id=%s', guild.id)  
+            await asyncio.sleep(self.interval)  
+  
+    async def members(self, guild: discord.Guild, role: discord.Role):  
+        if self.bot.intents.members:  
+            return {member.id for member in guild.members}, {member.id for member in role.members}  
+  
+        # GET /guilds/{id}/members needs the GUILD_MEMBERS privileged intent enabled for the application  
+        members, holders = set(), set()  
+        role_id = str(role.id)  
+        after = None  
+        while True:  
+            try:  
+                page = await self.bot.http.get_members(guild.id, 1000, after)  
+            except discord.Forbidden:  
+                self.can_list_members = False  
+                log.warning('cannot list guild members without the GUILD_MEMBERS intent; buyer roles will only be revoked on expiry')  
+                return None  
+            for data in page:  
+                user_id = int(data['user']['id'])  
+                members.add(user_id)  
+                if role_id in data['roles']:  
+                    holders.add(user_id)  
+            if len(page) < 1000:  
+                return members, holders  
+            after = page[-1]['user']['id']  
+  
+    async def reconcile(self, guild: discord.Guild):  
+        role = await self.bot.buyer_role(guild)  
+        if role is None:  
+            return  
+  
+        now = now_ms()  
+        if not self.bot.intents.members:  
+            if not self.can_list_members or now - self.listed_at.get(guild.id, 0) < self.list_interval * 1000:  
+                return  
+            self.listed_at[guild.id] = now  
+        desired = {int(user_id) for user_id, expires_at in self.bot.db.active_users.items() if expires_at > now}  
+        listing = await self.members(guild, role)  
+        if listing is None:  
+            return  
+        members, holders = listing  
+        added = removed = 0  
+        for user_id in (desired & members) - holders:  
+            self.enqueue('add', guild.id, role.id, user_id)  
+            added += 1  
+        for user_id in holders - desired:  
+            self.enqueue('remove', guild.id, role.id, user_id)  
+            removed += 1  
+        if added or removed:  
+            log.info('reconciling buyer role guild_id=%s adds=%d removals=%d', guild.id, added, removed)  
+  
+    async def revoke(self, user_ids: list):  
+        for guild in self.bot.guilds:  
+            role = await self.bot.buyer_role(guild)  
+            if role is None:  
+                continue  
+            holders = {member.id for member in role.members} if self.bot.intents.members else None  
+            for user_id in map(int, user_ids):  
+                if holders is None or user_id in holders:  
+                    self.enqueue('remove', guild.id, role.id, user_id)  
+  
+class LuarmorBot(commands.AutoShardedBot):  
+    def __init__(self):  
+        config = Config()  
+        if getattr(config, 'LEAN_INTENTS', True):  
+            intents = discord.Intents.none()  
+            intents.guilds = True  
+            member_cache_flags = discord.MemberCacheFlags.none()  
+        else:  
+            intents = discord.Intents.default()  
+            intents.message_content = True  
+            intents.members = True  
+            intents.guilds = True  
+            member_cache_flags = discord.MemberCacheFlags.from_intents(intents)  
+  
+        shard_count = os.environ.get('SHARD_COUNT')  
+        shard_ids = os.environ.get('SHARD_IDS')  
+        shard_ids = [int(shard_id) for shard_id in shard_ids.split(',')] if shard_ids else None  
+        database = Database()  
+        check_sharding(config, database, shard_ids)  
+  
+        super().__init__(  
+            command_prefix='/',  
+            intents=intents,  
+            member_cache_flags=member_cache_flags,  
+            chunk_guilds_at_startup=intents.members,  
+            shard_count=int(shard_count) if shard_count else None,  
+            shard_ids=shard_ids  
+        )  
+        self.primary = shard_ids is None or 0 in shard_ids  
+        self.config = config  
+        bus_url = getattr(self.config, 'INVALIDATION_BUS_URL', None)  
+        self.db = AsyncDatabase(  
+            database,  
+            workers=getattr(self.config, 'DB_WORKERS', 1),  
+            cache_ttl=getattr(self.config, 'AUTH_CACHE_TTL', 30),  
+            bus=RedisInvalidationBus(bus_url) if bus_url else None,  
+            api_key_secret=getattr(self.config, 'API_KEY_SECRET', None),  
+            snapshot_path=shard_path(getattr(self.config, 'INDEX_SNAPSHOT_FILE', 'index.snapshot'), shard_ids),  
+            snapshot_max_age=getattr(self.config, 'INDEX_SNAPSHOT_MAX_AGE', 86400)  
+        )  
+        self.expiry_task = None  
+        self.dms = DMDispatcher(  
+            workers=getattr(self.config, 'DM_WORKERS', 4),  
+            max_queue=getattr(self.config, 'DM_QUEUE_SIZE', 1000)  
+        )  
+        self.scripts = ScriptCache(self.config.SCRIPT_CONTENT, max_bytes=getattr(self.config, 'SCRIPT_CACHE_BYTES', 64 * 1024 * 1024))  
+        self.state_path = getattr(self.config, 'STATE_FILE', 'bot_state.json')  
+        self.audit = AuditJournal(getattr(self.config, 'AUDIT_LOG_FILE', 'audit.log'))  
+        self.buyer_roles = {}  
+        self.roles = RoleReconciler(  
+            self,  
+            workers=getattr(self.config, 'ROLE_WORKERS', 4),  
+            rate=getattr(self.config, 'ROLE_RATE', 5.0),  
+            interval=getattr(self.config, 'ROLE_RECONCILE_INTERVAL', 300),  
+            list_interval=getattr(self.config, 'ROLE_MEMBER_LIST_INTERVAL', 3600)  
+        )  
+        self.first_interaction_at = None  
+        self.ready_logged = False  
+        self.instrument_http()  
+  
+    def instrument_http(self):  
+        self.http.request = metrics.timed_request(self.http.request)  
+        adapter = webhook_async.async_context.get()  
+        adapter.request = metrics.timed_request(adapter.request)  
+  
+    async def setup_hook(self):  
+        with startup_stage('register_views'):  
+            self.panel_view = PanelView()  
+            self.add_view(self.panel_view)  
+            self.panel_reply_view = PanelView()  
+            self.panel_reply_view.stop()  
+        with startup_stage('subscribe_invalidations'):  
+            await self.db.bus.start(self.apply_invalidation)  
+        if self.primary:  
+            with startup_stage('seed_demo_keys'):  
+                await self.seed_demo_keys()  
+        with startup_stage('load_indexes'):  
+            await self.db.load_indexes()  
+        with startup_stage('load_audit_journal'):  
+            await self.audit.start()  
+        with startup_stage('compile_script_template'):  
+            panel_config = await self.db.get_panel_config()  
+            self.scripts.set_source(panel_config and panel_config.get('scriptLoadstring'))  
+        self.expiry_task = asyncio.create_task(self.expire_loop())  
+        self.dms.start()  
+        self.roles.start()  
+        if self.primary:  
+            with startup_stage('sync_commands'):  
+                await self.sync_commands()  
+  
+    async def apply_invalidation(self, message: dict):  
+        self.db.apply(message)  
+        if message['kind'] == 'panel':  
+            self.buyer_roles.clear()  
+            panel_config = await self.db.get_panel_config()  
+            self.scripts.set_source(panel_config and panel_config.get('scriptLoadstring'))  
+  
+    async def seed_demo_keys(self):  
+        if not getattr(self.config, 'SEED_DEMO_KEYS', True):  
+            return  
+  
+        state = load_state(self.state_path)  
+        if state.get('seedVersion') == SEED_VERSION:  
+            return  
+  
+        await self.db.seed_demo_keys()  
+        state['seedVersion'] = SEED_VERSION  
+        save_state(self.state_path, state)  
+        log.info('seeded demo keys version=%d codes=DEMO-KEY-1..DEMO-KEY-5', SEED_VERSION)  
+  
+    def command_tree_hash(self, guild: discord.abc.Snowflake = None) -> str:  
+        payload = sorted((command.to_dict(self.tree) for command in self.tree.get_commands(guild=guild)), key=lambda c: c['name'])  
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()  
+  
+    async def sync_commands(self):  
+        dev_guild_id = os.environ.get('DISCORD_DEV_GUILD_ID')  
+        guild = discord.Object(id=int(dev_guild_id)) if dev_guild_id else None  
+        if guild:  
+            self.tree.copy_global_to(guild=guild)  
+  
+        scope = dev_guild_id or 'global'  
+        tree_hash = self.command_tree_hash(guild)  
+        state = load_state(self.state_path)  
+        hashes = state.setdefault('commandTreeHashes', {})  
+        if hashes.get(scope) == tree_hash:  
+            log.info('command tree unchanged scope=%s', scope)  
+            return  
+  
+        await self.tree.sync(guild=guild)  
+        hashes[scope] = tree_hash  
+        save_state(self.state_path, state)  
+        log.info('synced command tree scope=%s', scope)  
+  
+    async def on_interaction(self, interaction: discord.Interaction):  
+        if self.first_interaction_at is None:  
+            self.first_interaction_at = time.perf_counter()  
+            log.info('first interaction since_start_ms=%.1f', since_start_ms())  
+  
+    async def close(self):  
+        if self.expiry_task:  
+            self.expiry_task.cancel()  
+        await self.dms.stop()  
+        await self.roles.stop()  
+        await self.db.bus.close()  
+        await super().close()  
+        await self.audit.close()  
+        self.db.close()  
+  
+    async def expire_loop(self):  
+        await self.wait_until_ready()  
+        while not self.is_closed():  
+            batch = await self.db.expiry.next_batch()  
+            try:  
+                lapsed = await self.db.expire(batch)  
+                if lapsed:  
+                    await self.roles.revoke(lapsed)  
+            except Exception:  
+                log.exception('failed to process expiry batch size=%d', len(batch))  
+  
+    async def buyer_role(self, guild: discord.Guild, create: bool = False):  
+        role_id = self.buyer_roles.get(guild.id)  
+        role = guild.get_role(role_id) if role_id else None  
+        if role:  
+            return role  
+  
+        panel_config = await self.db.get_panel_config()  
+        if panel_config:  
+            role = guild.get_role(int(panel_config['buyerRoleId']))  
+        else:  
+            role = discord.utils.get(guild.roles, name='Buyer')  
+            if role is None and create:  
+                role = await guild.create_role(name='Buyer', color=discord.Color.green())  
+        if role:  
+            self.buyer_roles[guild.id] = role.id  
+        return role  
+  
+    async def is_owner(self, user_id: str) -> bool:  
+        return user_id == OWNER_ID or await self.db.is_owner(user_id)  
+  
+    async def get_auth(self, interaction: discord.Interaction, load_user: bool = False) -> AuthContext:  
+        auth = interaction.extras.get('auth')  
+        if auth is None:  
+            user_id = str(interaction.user.id)  
+            is_owner = await self.is_owner(user_id)  
+            auth = AuthContext(user_id, is_owner, not is_owner and await self.db.is_logged_in(user_id))  
+            interaction.extras['auth'] = auth  
+        if load_user and not auth.loaded:  
+            status = await self.db.get_user_status(auth.user_id)  
+            auth.user = status['user']  
+            auth.is_active = status['active']  
+            auth.blacklist = status['blacklist']  
+            auth.key = status['key']  
+            auth.loaded = True  
+        return auth  
+  
+    async def has_manager_role(self, member: discord.Member) -> bool:  
+        if await self.is_owner(str(member.id)):  
+            return True  
+  
+        panel_config = await self.db.get_panel_config()  
         if not panel_config:  
             return any(role.name == 'Manager' for role in member.roles)  
         return any(role.id == int(panel_config['managerRoleId']) for role in member.roles)  
@@ -39,67 +1816,61 @@ bot = LuarmorBot()
   
 @bot.event  
 async def on_ready():  
-    print(f'Bot logged in as {bot.user}')  
-    bot.db.seed_demo_keys()  
-    print('Demo keys created: DEMO-KEY-1 through DEMO-KEY-5')  
-  
-    print('\n=== Luarmor Bot Ready ===')  
-    print('Available commands:')  
-    print('  /generateapi - Generate API key for a user (Manager)')  
-    print('  /login - Login with API key')  
-    print('  /setpanel - Configure panel (Manager)')  
-    print('  /ownerwl - Add/remove owners (Owner only)')  
-    print('  /whitelist - Whitelist a user (Manager, requires login)')  
-    print('  /blacklist - Blacklist a user (Manager, requires login)')  
-    print('  /force-resethwid - Force reset HWID (Manager, requires login)')  
-    print('  /createkey - Create a new key (Manager, requires login)')  
-    print('  /genkeys - Generate multiple keys for a user (Manager, requires login)')  
-    print('  /listkeys - List all keys (Manager, requires login)')  
-    print('  /panel - Open user control panel (requires login)')  
-    print('  /status - Check whitelist status (requires login)')  
-    print('\nDemo keys available: DEMO-KEY-1 to DEMO-KEY-5')  
+    if bot.ready_logged:  
+        return  
+    bot.ready_logged = True  
+    log.info(  
+        'ready user=%s shards=%s/%s guilds=%d commands=%s since_start_ms=%.1f',  
+        bot.user, ','.join(map(str, bot.shard_ids or ())), bot.shard_count, len(bot.guilds),  
+        ','.join(f'/{command.name}' for command in bot.tree.get_commands()), since_start_ms()  
+    )  
   
 @bot.tree.command(name="generateapi", description="Generate an API key (Manager only)")  
 @app_commands.describe(user="User to send the API key to")  
+@metrics.instrument  
 async def generateapi(interaction: discord.Interaction, user: discord.Member):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    result = bot.db.create_api_key(str(interaction.user.id), str(user.id))  
+    result = await bot.db.create_api_key(str(interaction.user.id), str(user.id))  
   
-    try:  
-        embed = discord.Embed(  
-            title='🔑 Your API Key',  
-            description=f"You've been given access to **{interaction.guild.name}**!\n\n**You must use this API key to access the bot.**",  
-            color=0x0099ff  
-        )  
-        embed.add_field(name='API Key (50 characters)', value=f"```{result['apiKey']['apiKey']}```", inline=False)  
-        embed.add_field(name='How to Login', value='Use `/login <apikey>` in the server to activate your access.\n\n**Without this API key, you cannot use any bot commands!**', inline=False)  
-        embed.set_footer(text='Keep this key safe and do not share it!')  
-        embed.timestamp = datetime.utcnow()  
+    embed = discord.Embed(  
+        title='🔑 Your API Key',  
+        description=f"You've been given access to **{interaction.guild.name}**!\n\n**You must use this API key to access the bot.**",  
+        color=0x0099ff  
+    )  
+    embed.add_field(name='API Key (50 characters)', value=f"```{result['apiKey']['apiKey']}```", inline=False)  
+    embed.add_field(name='How to Login', value='Use `/login <apikey>` in the server to activate your access.\n\n**Without this API key, you cannot use any bot commands!**', inline=False)  
+    embed.set_footer(text='Keep this key safe and do not share it!')  
+    embed.timestamp = datetime.utcnow()  
   
-        await user.send(embed=embed)  
+    response_embed = discord.Embed(  
+        title='✅ API Key Generated',  
+        description=f"Sending API key to **{user.name}** via DM...",  
+        color=0x00ff00  
+    )  
+    response_embed.add_field(name='Key', value=f"`{result['apiKey']['apiKey']}`", inline=False)  
+    response_embed.timestamp = datetime.utcnow()  
   
-        response_embed = discord.Embed(  
-            title='✅ API Key Generated',  
-            description=f"API key sent to **{user.name}** via DM!",  
-            color=0x00ff00  
-        )  
-        response_embed.add_field(name='Key', value=f"`{result['apiKey']['apiKey']}`", inline=False)  
-        response_embed.timestamp = datetime.utcnow()  
+    await interaction.response.send_message(embed=response_embed, ephemeral=True)  
   
-        await interaction.response.send_message(embed=response_embed, ephemeral=True)  
-    except:  
-        await interaction.response.send_message(  
-            f"❌ Could not DM **{user.name}**. They may have DMs disabled.\n\nAPI Key: `{result['apiKey']['apiKey']}`",  
-            ephemeral=True  
-        )  
+    async def report(delivered: bool):  
+        if delivered:  
+            response_embed.description = f"API key sent to **{user.name}** via DM!"  
+        else:  
+            response_embed.title = '❌ API Key Not Delivered'  
+            response_embed.description = f"Could not DM **{user.name}**. They may have DMs disabled."  
+            response_embed.color = 0xff0000  
+        await interaction.edit_original_response(embed=response_embed)  
+  
+    await bot.dms.submit(user, lambda: [{'embed': embed}], report)  
   
 @bot.tree.command(name="login", description="Login with your API key")  
 @app_commands.describe(apikey="Your API key")  
+@metrics.instrument  
 async def login(interaction: discord.Interaction, apikey: str):  
-    result = bot.db.login_with_api_key(str(interaction.user.id), interaction.user.name, apikey)  
+    result = await bot.db.login_with_api_key(str(interaction.user.id), interaction.user.name, apikey)  
   
     if not result['success']:  
         await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
@@ -123,99 +1894,212 @@ async def login(interaction: discord.Interaction, apikey: str):
     buyerrole="Buyer role",  
     managerrole="Manager role"  
 )  
+@metrics.instrument  
 async def setpanel(interaction: discord.Interaction, channel: discord.TextChannel, script: str, buyerrole: discord.Role, managerrole: discord.Role):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    bot.db.set_panel_config(str(channel.id), script, str(buyerrole.id), str(managerrole.id))  
-  
-    view = discord.ui.View(timeout=None)  
-    view.add_item(discord.ui.Button(label='Get Script', style=discord.ButtonStyle.success, emoji='📜', custom_id='get_script'))  
-    view.add_item(discord.ui.Button(label='Reset HWID', style=discord.ButtonStyle.primary, emoji='🔄', custom_id='reset_hwid'))  
-    view.add_item(discord.ui.Button(label='Get Role', style=discord.ButtonStyle.secondary, emoji='🎭', custom_id='get_role'))  
-    view.add_item(discord.ui.Button(label='Redeem Key', style=discord.ButtonStyle.secondary, emoji='🔑', custom_id='redeem_key'))  
-    view.add_item(discord.ui.Button(label='Get Stats', style=discord.ButtonStyle.secondary, emoji='📊', custom_id='get_stats'))  
-    view.add_item(discord.ui.Button(label='Check Status', style=discord.ButtonStyle.secondary, emoji='ℹ️', custom_id='check_status'))  
-  
-    embed = discord.Embed(  
-        title='🎮 Luarmor Control Panel',  
-        description='Welcome! Use the buttons below to manage your access.',  
-        color=0x0099ff  
-    )  
-    embed.add_field(name='📜 Get Script', value='Receive your script loader via DM', inline=True)  
-    embed.add_field(name='🔄 Reset HWID', value='Reset your hardware ID', inline=True)  
-    embed.add_field(name='🎭 Get Role', value='Claim your buyer role', inline=True)  
-    embed.add_field(name='🔑 Redeem Key', value='Redeem a key for 24-hour access', inline=True)  
-    embed.add_field(name='📊 Get Stats', value='View your statistics', inline=True)  
-    embed.add_field(name='ℹ️ Check Status', value='Check your whitelist status', inline=True)  
-    embed.set_footer(text='Make sure you are logged in before using the panel')  
-    embed.timestamp = datetime.utcnow()  
+    await bot.db.set_panel_config(str(channel.id), script, str(buyerrole.id), str(managerrole.id))  
+    bot.scripts.set_source(script)  
+    bot.buyer_roles.clear()  
   
     try:  
-        msg = await channel.send(embed=embed, view=view)  
-        bot.db.set_panel_message_id(str(msg.id))  
+        msg = await channel.send(embed=PANEL_EMBED, view=bot.panel_view)  
+        await bot.db.set_panel_message_id(str(msg.id))  
         await interaction.response.send_message(f'✅ Panel configured successfully in {channel.mention}!', ephemeral=True)  
     except:  
         await interaction.response.send_message('❌ Failed to create panel. Make sure I have permission to send messages in that channel.', ephemeral=True)  
   
 @bot.tree.command(name="whitelist", description="Whitelist a user (Manager only)")  
 @app_commands.describe(user="User to whitelist", days="Duration in days (default: 30)")  
+@metrics.instrument  
 async def whitelist(interaction: discord.Interaction, user: discord.Member, days: int = 30):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**\n\nYou must login with your 50-character API key to use this bot.\n\nUse `/login <apikey>` with the API key you received.', ephemeral=True)  
         return  
   
-    result = bot.db.whitelist_user(str(user.id), user.name, days)  
+    result = await bot.db.whitelist_user(str(user.id), user.name, days)  
   
     if not result['success']:  
         await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
         return  
   
-    panel_config = bot.db.get_panel_config()  
+    await bot.audit.append('whitelist', interaction.user.id, user.id, f'{days} days')  
+  
+    panel_config = await bot.db.get_panel_config()  
     panel_mention = f"<#{panel_config['channelId']}>" if panel_config else 'panel'  
   
     await interaction.response.send_message(f"<@{user.id}> you have been whitelisted! go to {panel_mention} to use script.")  
   
 @bot.tree.command(name="blacklist", description="Blacklist a user (Manager only)")  
 @app_commands.describe(user="User to blacklist", days="Duration in days (0 = permanent)", reason="Reason for blacklist")  
+@metrics.instrument  
 async def blacklist(interaction: discord.Interaction, user: discord.Member, days: int = 0, reason: str = "No reason provided"):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    bot.db.blacklist_user(str(user.id), user.name, days, reason)  
+    await bot.db.blacklist_user(str(user.id), user.name, days, reason)  
+    await bot.audit.append('blacklist', interaction.user.id, user.id, f"{f'{days} days' if days else 'permanent'}: {reason}")  
   
-    panel_config = bot.db.get_panel_config()  
+    panel_config = await bot.db.get_panel_config()  
     panel_mention = f"<#{panel_config['channelId']}>" if panel_config else 'panel'  
   
     await interaction.response.send_message(f"<@{user.id}> you have been blacklisted!⛔️ go to {panel_mention} click on stats to see the reason.")  
   
+async def iter_csv_rows(attachment: discord.Attachment):  
+    async with aiohttp.ClientSession() as session:  
+        async with session.get(attachment.url) as response:  
+            response.raise_for_status()  
+            line_number = 0  
+            async for line in response.content:  
+                line_number += 1  
+                row = next(csv.reader([line.decode('utf-8-sig', errors='replace')]), [])  
+                yield line_number, [field.strip() for field in row]  
+  
+def parse_bulk_row(kind: str, row: list) -> tuple:  
+    user_id = row[0]  
+    if not user_id.isdigit() or not 15 <= len(user_id) <= 20:  
+        raise ValueError(f'invalid user id `{user_id[:32]}`')  
+  
+    days_value = row[1] if len(row) > 1 and row[1] else None  
+    try:  
+        days = int(days_value) if days_value else (30 if kind == 'whitelist' else 0)  
+    except ValueError:  
+        raise ValueError(f'invalid days `{days_value[:16]}`')  
+  
+    if kind == 'whitelist':  
+        if days < 1:  
+            raise ValueError('days must be at least 1')  
+        username = row[2] if len(row) > 2 and row[2] else user_id  
+        return user_id, username, days  
+  
+    if days < 0:  
+        raise ValueError('days cannot be negative')  
+    reason = row[2] if len(row) > 2 and row[2] else 'No reason provided'  
+    return user_id, user_id, days, reason  
+  
+async def import_bulk(interaction: discord.Interaction, attachment: discord.Attachment, kind: str):  
+    if not await bot.has_manager_role(interaction.user):  
+        await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
+        return  
+  
+    if (await bot.get_auth(interaction)).is_guest:  
+        await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
+        return  
+  
+    if attachment.size > MAX_BULK_FILE_SIZE:  
+        await interaction.response.send_message(f'❌ The file is too large. The limit is {MAX_BULK_FILE_SIZE // (1024 * 1024)} MB.', ephemeral=True)  
+        return  
+  
+    await interaction.response.defer(ephemeral=True)  
+    progress = await interaction.followup.send(f'⏳ Importing **{attachment.filename}**...', ephemeral=True, wait=True)  
+    apply_batch = bot.db.whitelist_users_bulk if kind == 'whitelist' else bot.db.blacklist_users_bulk  
+  
+    applied = 0  
+    failed = 0  
+    errors = []  
+    batch = []  
+    reported_at = time.monotonic()  
+  
+    async def flush():  
+        nonlocal applied, failed, reported_at  
+        results = await apply_batch(batch)  
+        audits = []  
+        for row, result in zip(batch, results):  
+            if result['success']:  
+                applied += 1  
+                detail = f'{row[2]} days' if kind == 'whitelist' else f"{f'{row[2]} days' if row[2] else 'permanent'}: {row[3]}"  
+                audits.append(bot.audit.append(kind, interaction.user.id, row[0], detail))  
+            else:  
+                failed += 1  
+                if len(errors) < 10:  
+                    errors.append(f"`{row[0]}`: {result.get('error', 'failed')}")  
+        await asyncio.gather(*audits)  
+        batch.clear()  
+  
+        if time.monotonic() - reported_at >= BULK_PROGRESS_INTERVAL:  
+            reported_at = time.monotonic()  
+            await progress.edit(content=f'⏳ Importing **{attachment.filename}**... {applied} applied, {failed} failed so far.')  
+  
+    try:  
+        async for line_number, row in iter_csv_rows(attachment):  
+            if not row or not any(row):  
+                continue  
+            if line_number == 1 and not row[0].isdigit():  
+                continue  
+            try:  
+                batch.append(parse_bulk_row(kind, row))  
+            except ValueError as e:  
+                failed += 1  
+                if len(errors) < 10:  
+                    errors.append(f'line {line_number}: {e}')  
+                continue  
+            if len(batch) >= BULK_BATCH_SIZE:  
+                await flush()  
+        if batch:  
+            await flush()  
+    except aiohttp.ClientError:  
+        log.exception('failed to download bulk %s file', kind)  
+        await progress.edit(content=f'❌ Could not download **{attachment.filename}**. {applied} rows were applied and {failed} failed before the error.')  
+        return  
+    except ValueError as e:  
+        log.warning('rejected bulk %s file filename=%s error=%s', kind, attachment.filename, e)  
+        await progress.edit(content=f'❌ Could not read **{attachment.filename}**: {e}. {applied} rows were applied and {failed} failed before the error.')  
+        return  
+    except Exception:  
+        log.exception('failed to import bulk %s file', kind)  
+        await progress.edit(content=f'❌ Importing **{attachment.filename}** failed. {applied} rows were applied and {failed} failed before the error.')  
+        return  
+  
+    summary = f"✅ {'Whitelisted' if kind == 'whitelist' else 'Blacklisted'} **{applied}** users from **{attachment.filename}**."  
+    if failed:  
+        summary += f'\n\n⚠️ **{failed}** rows failed:\n' + '\n'.join(errors)  
+        if failed > len(errors):  
+            summary += f'\n...and {failed - len(errors)} more.'  
+    await progress.edit(content=summary[:2000])  
+  
+@bot.tree.command(name="whitelist-bulk", description="Whitelist users from a CSV of user_id,days[,username] (Manager only)")  
+@app_commands.describe(file="CSV file with one user per line")  
+@metrics.instrument  
+async def whitelist_bulk(interaction: discord.Interaction, file: discord.Attachment):  
+    await import_bulk(interaction, file, 'whitelist')  
+  
+@bot.tree.command(name="blacklist-bulk", description="Blacklist users from a CSV of user_id,days[,reason] (Manager only)")  
+@app_commands.describe(file="CSV file with one user per line")  
+@metrics.instrument  
+async def blacklist_bulk(interaction: discord.Interaction, file: discord.Attachment):  
+    await import_bulk(interaction, file, 'blacklist')  
+  
 @bot.tree.command(name="force-resethwid", description="Force reset a user's HWID (Manager only)")  
 @app_commands.describe(user="User to reset HWID for")  
+@metrics.instrument  
 async def force_resethwid(interaction: discord.Interaction, user: discord.Member):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    result = bot.db.reset_hwid(str(user.id), interaction.user.name)  
+    result = await bot.db.reset_hwid(str(user.id), interaction.user.name)  
   
     if not result['success']:  
         await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
         return  
   
+    await bot.audit.append('reset_hwid', interaction.user.id, user.id)  
+  
     embed = discord.Embed(  
         title='✅ HWID Reset',  
         description=f"**{user.name}**'s HWID has been reset!",  
@@ -227,21 +2111,24 @@ async def force_resethwid(interaction: discord.Interaction, user: discord.Member
   
 @bot.tree.command(name="createkey", description="Create a new key (Manager only)")  
 @app_commands.describe(code="Key code", days="Duration in days (default: 30)")  
+@metrics.instrument  
 async def createkey(interaction: discord.Interaction, code: str, days: int = 30):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    result = bot.db.create_key(code, days, interaction.user.name)  
+    result = await bot.db.create_key(code, days, interaction.user.name)  
   
     if not result['success']:  
         await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
         return  
   
+    await bot.audit.append('create_key', interaction.user.id, detail=f'{code} ({days} days)')  
+  
     embed = discord.Embed(title='✅ Key Created', color=0x00ff00)  
     embed.add_field(name='Code', value=f"`{code}`", inline=True)  
     embed.add_field(name='Duration', value=f"{days} days", inline=True)  
@@ -249,105 +2136,155 @@ async def createkey(interaction: discord.Interaction, code: str, days: int = 30)
   
     await interaction.response.send_message(embed=embed, ephemeral=True)  
   
+async def create_keys_in_batches(amount: int, days: int, created_by: str):  
+    for start in range(0, amount, KEY_BATCH_SIZE):  
+        codes = generate_key_codes(min(KEY_BATCH_SIZE, amount - start))  
+        for code in await bot.db.create_keys_bulk(codes, days, created_by):  
+            yield code  
+  
 @bot.tree.command(name="genkeys", description="Generate multiple keys for a user (Manager only)")  
-@app_commands.describe(user="User to send keys to", amount="Number of keys to generate (max 900)", days="Duration in days for each key (default: 30)")  
+@app_commands.describe(user="User to send keys to", amount=f"Number of keys to generate (max {MAX_GENERATED_KEYS})", days="Duration in days for each key (default: 30)")  
+@metrics.instrument  
 async def genkeys(interaction: discord.Interaction, user: discord.Member, amount: int, days: int = 30):  
-    if not bot.has_manager_role(interaction.user):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    if amount > 900:  
-        amount = 900  
+    if amount > MAX_GENERATED_KEYS:  
+        amount = MAX_GENERATED_KEYS  
     if amount < 1:  
         await interaction.response.send_message('❌ Amount must be at least 1.', ephemeral=True)  
         return  
   
     await interaction.response.defer(ephemeral=True)  
   
-    import time  
-    import random  
-    import string  
-  
-    generated_keys = []  
-    for i in range(amount):  
-        key_code = f"KEY-{int(time.time() * 1000)}-{''.join(random.choices(string.ascii_uppercase + string.digits, k=8))}"  
-        result = bot.db.create_key(key_code, days, interaction.user.name)  
-        if result['success']:  
-            generated_keys.append(key_code)  
-  
-    keys_content = '\n'.join(generated_keys)  
-  
+    writer = KeyFileWriter(f"keys-{user.name}-{int(time.time())}", getattr(bot.config, 'ATTACHMENT_LIMIT', 8 * 1024 * 1024))  
     try:  
-        await user.send(  
-            f"🎁 **You have been rewarded free keys to the script!**\n\nYou received **{len(generated_keys)}** keys, each valid for **{days} days**.\n\nThe keys are attached as a text file below."  
-        )  
+        async for code in create_keys_in_batches(amount, days, interaction.user.name):  
+            writer.write(code)  
+        attachments = writer.prepare()  
+    except Exception:  
+        writer.close()  
+        raise  
+  
+    await bot.audit.append('generate_keys', interaction.user.id, user.id, f'{writer.count} keys ({days} days)')  
+  
+    attachment_note = 'The keys are attached as a text file below.' if not writer.parts else f'The keys are attached below as {len(attachments)} gzip-compressed file(s).'  
+    content = f"🎁 **You have been rewarded free keys to the script!**\n\nYou received **{writer.count}** keys, each valid for **{days} days**.\n\n{attachment_note}"  
+  
+    def build():  
+        files = writer.files()  
+        return [  
+            {'content': content if i == 0 else None, 'files': files[i:i + MAX_FILES_PER_MESSAGE]}  
+            for i in range(0, len(files), MAX_FILES_PER_MESSAGE)  
+        ]  
+  
+    async def report(delivered: bool):  
+        writer.close()  
+        if delivered:  
+            await interaction.followup.send(  
+                f"✅ Successfully generated and sent **{writer.count}** keys to **{user.name}** via DM!\n\nEach key is valid for **{days} days**."  
+            )  
+        else:  
+            await interaction.followup.send(  
+                f"❌ Could not DM **{user.name}**. They may have DMs disabled.\n\n**{writer.count}** keys were created but could not be delivered."  
+            )  
   
-        file = discord.File(io.BytesIO(keys_content.encode()), filename=f"keys-{user.name}-{int(time.time())}.txt")  
-        await user.send(file=file)  
+    await bot.dms.submit(user, build, report)  
   
-        await interaction.followup.send(  
-            f"✅ Successfully generated and sent **{len(generated_keys)}** keys to **{user.name}** via DM!\n\nEach key is valid for **{days} days**."  
-        )  
-    except:  
-        await interaction.followup.send(  
-            f"❌ Could not DM **{user.name}**. They may have DMs disabled.\n\n**{len(generated_keys)}** keys were created but could not be delivered."  
-        )  
+def build_keys_embed(keys: list, total: int, page_number: int) -> discord.Embed:  
+    key_list = []  
+    for key in keys:  
+        status_emoji = '✅' if key['status'] == KEY_STATUS_REDEEMED else ('❌' if key['status'] == KEY_STATUS_EXPIRED else '⏳')  
+        key_list.append(f"{status_emoji} `{key['code']}` - {key['status']} ({key['duration']}d)")  
+  
+    embed = discord.Embed(  
+        title='📋 Keys List',  
+        description='\n'.join(key_list) if key_list else 'No keys',  
+        color=0x0099ff  
+    )  
+    embed.set_footer(text=f"Page {page_number} • Showing {len(keys)} of {total} keys")  
+    embed.timestamp = datetime.utcnow()  
+    return embed  
+  
+class KeyListView(discord.ui.View):  
+    def __init__(self, owner_id: int, status: str, created_by: str, total: int):  
+        super().__init__(timeout=300)  
+        self.owner_id = owner_id  
+        self.status = status  
+        self.created_by = created_by  
+        self.total = total  
+        self.cursors = [None]  
+        self.next_cursor = None  
+  
+    async def render(self) -> discord.Embed:  
+        page = await bot.db.get_keys_page(self.status, self.created_by, self.cursors[-1])  
+        self.next_cursor = page['nextCursor']  
+        self.previous_page.disabled = len(self.cursors) == 1  
+        self.next_page.disabled = self.next_cursor is None  
+        return build_keys_embed(page['keys'], self.total, len(self.cursors))  
+  
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:  
+        return interaction.user.id == self.owner_id  
+  
+    @discord.ui.button(label='Prev', style=discord.ButtonStyle.secondary, emoji='◀️')  
+    @metrics.instrument  
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        self.cursors.pop()  
+        await interaction.response.edit_message(embed=await self.render(), view=self)  
+  
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.secondary, emoji='▶️')  
+    @metrics.instrument  
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        self.cursors.append(self.next_cursor)  
+        await interaction.response.edit_message(embed=await self.render(), view=self)  
   
 @bot.tree.command(name="listkeys", description="List all keys (Manager only)")  
-async def listkeys(interaction: discord.Interaction):  
-    if not bot.has_manager_role(interaction.user):  
+@app_commands.describe(status="Only show keys with this status", creator="Only show keys created by this manager")  
+@app_commands.choices(status=[  
+    app_commands.Choice(name="Unused", value=KEY_STATUS_UNUSED),  
+    app_commands.Choice(name="Redeemed", value=KEY_STATUS_REDEEMED),  
+    app_commands.Choice(name="Expired", value=KEY_STATUS_EXPIRED)  
+])  
+@metrics.instrument  
+async def listkeys(interaction: discord.Interaction, status: app_commands.Choice[str] = None, creator: discord.Member = None):  
+    if not await bot.has_manager_role(interaction.user):  
         await interaction.response.send_message('❌ You need the Manager role to use this command.', ephemeral=True)  
         return  
   
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    if (await bot.get_auth(interaction)).is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    keys = bot.db.get_all_keys()  
+    status_value = status.value if status else None  
+    created_by = creator.name if creator else None  
+    total = await bot.db.count_keys(status_value, created_by)  
   
-    if not keys:  
+    if not total:  
         await interaction.response.send_message('📋 No keys found.', ephemeral=True)  
         return  
   
-    key_list = []  
-    for key in keys[:25]:  
-        status_emoji = '✅' if key['status'] == 'redeemed' else ('❌' if key['status'] == 'expired' else '⏳')  
-        key_list.append(f"{status_emoji} `{key['code']}` - {key['status']} ({key['duration']}d)")  
-  
-    embed = discord.Embed(  
-        title='📋 Keys List',  
-        description='\n'.join(key_list) if key_list else 'No keys',  
-        color=0x0099ff  
-    )  
-    embed.set_footer(text=f"Showing {min(len(keys), 25)} of {len(keys)} keys")  
-    embed.timestamp = datetime.utcnow()  
-  
-    await interaction.response.send_message(embed=embed, ephemeral=True)  
+    view = KeyListView(interaction.user.id, status_value, created_by, total)  
+    await interaction.response.send_message(embed=await view.render(), view=view, ephemeral=True)  
   
 @bot.tree.command(name="panel", description="Open user control panel (requires login)")  
+@metrics.instrument  
 async def panel(interaction: discord.Interaction):  
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    auth = await bot.get_auth(interaction, load_user=True)  
+    if auth.is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    user_data = bot.db.get_user(str(interaction.user.id))  
+    user_data = auth.user  
   
-    if not user_data or not bot.db.is_user_active(str(interaction.user.id)):  
+    if not auth.is_whitelisted:  
         await interaction.response.send_message('❌ You are not whitelisted. Please contact an administrator.', ephemeral=True)  
         return  
   
-    view = discord.ui.View(timeout=None)  
-    view.add_item(discord.ui.Button(label='Get Script', style=discord.ButtonStyle.success, emoji='📜', custom_id='get_script'))  
-    view.add_item(discord.ui.Button(label='Reset HWID', style=discord.ButtonStyle.primary, emoji='🔄', custom_id='reset_hwid'))  
-    view.add_item(discord.ui.Button(label='Get Role', style=discord.ButtonStyle.secondary, emoji='🎭', custom_id='get_role'))  
-    view.add_item(discord.ui.Button(label='Redeem Key', style=discord.ButtonStyle.secondary, emoji='🔑', custom_id='redeem_key'))  
-    view.add_item(discord.ui.Button(label='Get Stats', style=discord.ButtonStyle.secondary, emoji='📊', custom_id='get_stats'))  
-    view.add_item(discord.ui.Button(label='Check Status', style=discord.ButtonStyle.secondary, emoji='ℹ️', custom_id='check_status'))  
-  
     status_text = '✅ Active' if user_data['status'] == 'active' else '❌ Inactive'  
     expires_timestamp = int(user_data['expiresAt'] / 1000)  
   
@@ -361,22 +2298,24 @@ async def panel(interaction: discord.Interaction):
     embed.add_field(name='HWID', value=user_data.get('hwid') or 'Not set', inline=True)  
     embed.timestamp = datetime.utcnow()  
   
-    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)  
+    await interaction.response.send_message(embed=embed, view=bot.panel_reply_view, ephemeral=True)  
   
 @bot.tree.command(name="status", description="Check your whitelist status (requires login)")  
+@metrics.instrument  
 async def status(interaction: discord.Interaction):  
-    if not bot.db.is_logged_in(str(interaction.user.id)) and not bot.is_owner(str(interaction.user.id)):  
+    auth = await bot.get_auth(interaction, load_user=True)  
+    if auth.is_guest:  
         await interaction.response.send_message('🔒 **Authentication Required!**', ephemeral=True)  
         return  
   
-    user_data = bot.db.get_user(str(interaction.user.id))  
+    user_data = auth.user  
   
     if not user_data:  
         await interaction.response.send_message('❌ You are not whitelisted.', ephemeral=True)  
         return  
   
-    is_active = bot.db.is_user_active(str(interaction.user.id))  
-    is_blacklisted = bot.db.is_blacklisted(str(interaction.user.id))  
+    is_active = auth.is_active  
+    is_blacklisted = auth.blacklist is not None  
   
     embed = discord.Embed(  
         title='📊 Whitelist Status',  
@@ -396,8 +2335,9 @@ async def status(interaction: discord.Interaction):
     app_commands.Choice(name="Add", value="add"),  
     app_commands.Choice(name="Remove", value="remove")  
 ])  
+@metrics.instrument  
 async def ownerwl(interaction: discord.Interaction, user: discord.Member, action: app_commands.Choice[str]):  
-    if not bot.is_owner(str(interaction.user.id)):  
+    if not await bot.is_owner(str(interaction.user.id)):  
         await interaction.response.send_message('❌ Only owners can use this command.', ephemeral=True)  
         return  
   
@@ -406,7 +2346,8 @@ async def ownerwl(interaction: discord.Interaction, user: discord.Member, action
         return  
   
     if action.value == 'add':  
-        bot.db.add_owner(str(user.id), user.name, interaction.user.name)  
+        await bot.db.add_owner(str(user.id), user.name, interaction.user.name)  
+        await bot.audit.append('add_owner', interaction.user.id, user.id)  
   
         embed = discord.Embed(  
             title='👑 Owner Added',  
@@ -418,7 +2359,8 @@ async def ownerwl(interaction: discord.Interaction, user: discord.Member, action
   
         await interaction.response.send_message(embed=embed)  
     else:  
-        bot.db.remove_owner(str(user.id), user.name, interaction.user.name)  
+        await bot.db.remove_owner(str(user.id), user.name, interaction.user.name)  
+        await bot.audit.append('remove_owner', interaction.user.id, user.id)  
   
         embed = discord.Embed(  
             title='👑 Owner Removed',  
@@ -429,157 +2371,232 @@ async def ownerwl(interaction: discord.Interaction, user: discord.Member, action
   
         await interaction.response.send_message(embed=embed)  
   
-@bot.event  
-async def on_interaction(interaction: discord.Interaction):  
-    if interaction.type == discord.InteractionType.component:  
-        custom_id = interaction.data['custom_id']  
+@bot.tree.command(name="metrics", description="Show handler latency and error metrics (Owner only)")  
+@metrics.instrument  
+async def metrics_command(interaction: discord.Interaction):  
+    if not await bot.is_owner(str(interaction.user.id)):  
+        await interaction.response.send_message('❌ Only owners can use this command.', ephemeral=True)  
+        return  
   
-        user_id = str(interaction.user.id)  
-        is_whitelisted = bot.db.get_user(user_id) and bot.db.is_user_active(user_id)  
-        is_guest = not bot.db.is_logged_in(user_id) and not bot.is_owner(user_id)  
+    file = discord.File(io.BytesIO(metrics.render().encode()), filename='metrics.txt')  
+    await interaction.response.send_message('📈 Current metrics:', file=file, ephemeral=True)  
   
-        if custom_id in ['get_script', 'get_role', 'get_stats', 'check_status', 'reset_hwid']:  
-            if is_guest:  
-                await interaction.response.send_message('🔒 **Authentication Required!**\n\nYou must login with your API key or redeem a key to use this function.', ephemeral=True)  
-                return  
-            if not is_whitelisted:  
-                await interaction.response.send_message('❌ Your whitelist has expired or is inactive.', ephemeral=True)  
-                return  
+@bot.tree.command(name="audit", description="Show the moderation history of a user (Owner only)")  
+@app_commands.describe(user="User to show the history for")  
+@metrics.instrument  
+async def audit(interaction: discord.Interaction, user: discord.User):  
+    if not await bot.is_owner(str(interaction.user.id)):  
+        await interaction.response.send_message('❌ Only owners can use this command.', ephemeral=True)  
+        return  
   
-        if custom_id == 'get_script':  
-            panel_config = bot.db.get_panel_config()  
-            key_to_use = bot.db.get_key_for_user(user_id) or 'NO-KEY-ASSIGNED'  
+    records = await bot.audit.history(user.id)  
+    if not records:  
+        await interaction.response.send_message(f'📋 No audit entries for **{user.name}**.', ephemeral=True)  
+        return  
   
-            if panel_config and panel_config.get('scriptLoadstring'):  
-                script_content = panel_config['scriptLoadstring'].replace('{{KEY}}', key_to_use)  
-            else:  
-                script_content = bot.config.SCRIPT_CONTENT.replace('{{KEY}}', key_to_use)  
+    lines = []  
+    for record in records:  
+        line = f"<t:{record['at'] // 1000}:f> **{record['action']}** by <@{record['actor']}>"  
+        if record['target']:  
+            line += f" → <@{record['target']}>"  
+        if record['detail']:  
+            line += f" · {record['detail']}"  
+        lines.append(line)  
+  
+    embed = discord.Embed(title=f'🗂️ Audit Log: {user.name}', description='\n'.join(lines)[:4096], color=0x0099ff)  
+    embed.set_footer(text=f'Showing the latest {len(records)} entries')  
+    embed.timestamp = datetime.utcnow()  
   
-            try:  
-                file = discord.File(io.BytesIO(script_content.encode()), filename='loader.lua')  
-                await interaction.user.send('📜 **Here\'s your script!**\n\nCopy and use the script below:', file=file)  
-                await interaction.response.send_message('✅ Script sent to your DMs!', ephemeral=True)  
-            except:  
-                await interaction.response.send_message('❌ Could not send DM. Please enable DMs from server members.', ephemeral=True)  
-  
-        elif custom_id == 'reset_hwid':  
-            if not bot.config.ENABLE_SELF_HWID_RESET:  
-                await interaction.response.send_message('❌ Self-service HWID reset is disabled. Contact an administrator.', ephemeral=True)  
-                return  
+    await interaction.response.send_message(embed=embed, ephemeral=True)  
   
-            result = bot.db.reset_hwid(user_id)  
+PANEL_EMBED = discord.Embed(  
+    title='🎮 Luarmor Control Panel',  
+    description='Welcome! Use the buttons below to manage your access.',  
+    color=0x0099ff  
+)  
+PANEL_EMBED.add_field(name='📜 Get Script', value='Receive your script loader via DM', inline=True)  
+PANEL_EMBED.add_field(name='🔄 Reset HWID', value='Reset your hardware ID', inline=True)  
+PANEL_EMBED.add_field(name='🎭 Get Role', value='Claim your buyer role', inline=True)  
+PANEL_EMBED.add_field(name='🔑 Redeem Key', value='Redeem a key for 24-hour access', inline=True)  
+PANEL_EMBED.add_field(name='📊 Get Stats', value='View your statistics', inline=True)  
+PANEL_EMBED.add_field(name='ℹ️ Check Status', value='Check your whitelist status', inline=True)  
+PANEL_EMBED.set_footer(text='Make sure you are logged in before using the panel')  
   
-            if not result['success']:  
-                await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
-                return  
+class RedeemKeyModal(discord.ui.Modal, title='Redeem Key'):  
+    key_input = discord.ui.TextInput(label='Enter your key', placeholder='KEY-XXXX-XXXX', custom_id='key_input', style=discord.TextStyle.short)  
   
-            await interaction.response.send_message('✅ Your HWID has been reset successfully!', ephemeral=True)  
+    def __init__(self):  
+        super().__init__(custom_id='redeem_key_modal')  
   
-        elif custom_id == 'get_role':  
-            panel_config = bot.db.get_panel_config()  
-            if panel_config:  
-                role = interaction.guild.get_role(int(panel_config['buyerRoleId']))  
-                if role and role not in interaction.user.roles:  
-                    await interaction.user.add_roles(role)  
-                await interaction.response.send_message(f"✅ <@&{panel_config['buyerRoleId']}> role has been assigned to you!", ephemeral=True)  
-            else:  
-                buyer_role = discord.utils.get(interaction.guild.roles, name='Buyer')  
-                if not buyer_role:  
-                    buyer_role = await interaction.guild.create_role(name='Buyer', color=discord.Color.green())  
-                if buyer_role not in interaction.user.roles:  
-                    await interaction.user.add_roles(buyer_role)  
-                await interaction.response.send_message('✅ Buyer role has been assigned to you!', ephemeral=True)  
-  
-        elif custom_id == 'redeem_key':  
-            if bot.db.is_logged_in(user_id) or bot.is_owner(user_id):  
-                await interaction.response.send_message('❌ You are already logged in. You cannot redeem another key.', ephemeral=True)  
-                return  
-            if bot.db.get_user(user_id):  
-                await interaction.response.send_message('❌ You already have an active session. Please wait for it to expire or contact an admin.', ephemeral=True)  
-                return  
+    @metrics.instrument  
+    async def on_submit(self, interaction: discord.Interaction):  
+        key = self.key_input.value  
+        auth = await bot.get_auth(interaction, load_user=True)  
+        user_id = auth.user_id  
   
-            await interaction.response.send_modal(discord.ui.Modal(title="Redeem Key", custom_id="redeem_key_modal",  
-                components=[  
-                    discord.ui.InputText(label="Enter your key", placeholder="KEY-XXXX-XXXX", custom_id="key_input", style=discord.TextStyle.short)  
-                ]  
-            ))  
-  
-        elif custom_id == 'get_stats':  
-            user_data = bot.db.get_user(user_id)  
-            is_active = bot.db.is_user_active(user_id)  
-            active_users = bot.db.get_all_active_users()  
-            all_keys = bot.db.get_all_keys()  
-            redeemed_keys = sum(1 for k in all_keys if k['status'] == 'redeemed')  
-            blacklist_info = bot.db.get_blacklist_info(user_id)  
-  
-            stats_message = f"**📊 Your Statistics**\n\n"  
-            stats_message += f"Your Status: {'✅ Active' if is_active else '❌ Inactive'}\n"  
-            stats_message += f"Your HWID: {user_data.get('hwid') or 'Not set'}\n"  
-            stats_message += f"Expires: <t:{int(user_data['expiresAt'] / 1000)}:R>\n"  
-  
-            if blacklist_info:  
-                stats_message += f"\n⛔️ **BLACKLISTED**\n"  
-                stats_message += f"Reason: {blacklist_info['reason']}\n"  
-                if blacklist_info['permanent']:  
-                    stats_message += "Duration: Permanent\n"  
-                else:  
-                    stats_message += f"Duration: Until <t:{int(blacklist_info['unblacklistAt'] / 1000)}:R>\n"  
+        if not auth.is_guest:  
+            await interaction.response.send_message('❌ You are already logged in. You cannot redeem another key.', ephemeral=True)  
+            return  
+        if auth.user and (auth.is_active or auth.blacklist):  
+            await interaction.response.send_message('❌ You already have an active session. Please wait for it to expire or contact an admin.', ephemeral=True)  
+            return  
   
-            stats_message += f"\nTotal Active Users: {len(active_users)}\n"  
-            stats_message += f"Total Keys: {len(all_keys)}\n"  
-            stats_message += f"Redeemed Keys: {redeemed_keys}"  
+        result = await bot.db.redeem_key(user_id, interaction.user.name, key)  
   
-            await interaction.response.send_message(stats_message, ephemeral=True)  
+        if not result['success']:  
+            await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
+            return  
   
-        elif custom_id == 'check_status':  
-            user_data = bot.db.get_user(user_id)  
-            is_active = bot.db.is_user_active(user_id)  
+        bot.scripts.invalidate(user_id)  
   
-            embed = discord.Embed(  
-                title='📊 Your Status',  
-                color=0x00ff00 if is_active else 0xff0000  
-            )  
-            embed.add_field(name='Status', value='✅ Active' if is_active else '❌ Inactive', inline=True)  
-            embed.add_field(name='Expires', value=f"<t:{int(user_data['expiresAt'] / 1000)}:R>", inline=True)  
-            embed.add_field(name='HWID', value=user_data.get('hwid') or 'Not set', inline=True)  
-            embed.timestamp = datetime.utcnow()  
+        user_data = result['user']  
+        expires_timestamp = int(user_data['expiresAt'] / 1000)  
   
-            await interaction.response.send_message(embed=embed, ephemeral=True)  
+        embed = discord.Embed(  
+            title='🔑 Key Redeemed Successfully!',  
+            description='You have gained 24-hour access to the script!',  
+            color=0x00ff00  
+        )  
+        embed.add_field(name='Expires', value=f"Your access will expire <t:{expires_timestamp}:R>", inline=False)  
+        embed.set_footer(text='Enjoy using the script!')  
+        embed.timestamp = datetime.utcnow()  
   
-    elif interaction.type == discord.InteractionType.modal_submit:  
-        if interaction.data['custom_id'] == 'redeem_key_modal':  
-            key = interaction.data['components'][0]['components'][0]['value']  
-            user_id = str(interaction.user.id)  
+        await interaction.response.send_message(embed=embed, ephemeral=True)  
   
-            if bot.db.is_logged_in(user_id) or bot.is_owner(user_id):  
-                await interaction.response.send_message('❌ You are already logged in. You cannot redeem another key.', ephemeral=True)  
-                return  
-            if bot.db.get_user(user_id):  
-                await interaction.response.send_message('❌ You already have an active session. Please wait for it to expire or contact an admin.', ephemeral=True)  
-                return  
+class PanelView(discord.ui.View):  
+    def __init__(self):  
+        super().__init__(timeout=None)  
   
-            result = bot.db.redeem_key(user_id, interaction.user.name, key)  
+    async def _scheduled_task(self, item: discord.ui.Item, interaction: discord.Interaction):  
+        with metrics.scope(f'PanelView.{item.custom_id}'):  
+            return await super()._scheduled_task(item, interaction)  
   
-            if not result['success']:  
-                await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
-                return  
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:  
+        auth = await bot.get_auth(interaction, load_user=True)  
+        if interaction.data['custom_id'] == 'redeem_key':  
+            return True  
+  
+        if auth.is_guest:  
+            await interaction.response.send_message('🔒 **Authentication Required!**\n\nYou must login with your API key or redeem a key to use this function.', ephemeral=True)  
+            return False  
+        if not auth.is_whitelisted:  
+            await interaction.response.send_message('❌ Your whitelist has expired or is inactive.', ephemeral=True)  
+            return False  
+        return True  
+  
+    @discord.ui.button(label='Get Script', style=discord.ButtonStyle.success, emoji='📜', custom_id='get_script')  
+    @metrics.instrument  
+    async def get_script(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        auth = await bot.get_auth(interaction, load_user=True)  
+        key_to_use = auth.key or 'NO-KEY-ASSIGNED'  
+        payload = bot.scripts.render(auth.user_id, key_to_use)  
+  
+        await interaction.response.send_message('📨 Sending your script to your DMs...', ephemeral=True)  
+  
+        def build():  
+            return [{'content': '📜 **Here\'s your script!**\n\nCopy and use the script below:', 'file': discord.File(io.BytesIO(payload), filename='loader.lua')}]  
+  
+        async def report(delivered: bool):  
+            if delivered:  
+                await interaction.edit_original_response(content='✅ Script sent to your DMs!')  
+            else:  
+                await interaction.edit_original_response(content='❌ Could not send DM. Please enable DMs from server members.')  
+  
+        await bot.dms.submit(interaction.user, build, report)  
+  
+    @discord.ui.button(label='Reset HWID', style=discord.ButtonStyle.primary, emoji='🔄', custom_id='reset_hwid')  
+    @metrics.instrument  
+    async def reset_hwid(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        if not bot.config.ENABLE_SELF_HWID_RESET:  
+            await interaction.response.send_message('❌ Self-service HWID reset is disabled. Contact an administrator.', ephemeral=True)  
+            return  
+  
+        result = await bot.db.reset_hwid(str(interaction.user.id))  
+  
+        if not result['success']:  
+            await interaction.response.send_message(f"❌ {result['error']}", ephemeral=True)  
+            return  
+  
+        await interaction.response.send_message('✅ Your HWID has been reset successfully!', ephemeral=True)  
+  
+    @discord.ui.button(label='Get Role', style=discord.ButtonStyle.secondary, emoji='🎭', custom_id='get_role')  
+    @metrics.instrument  
+    async def get_role(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        panel_config = await bot.db.get_panel_config()  
+        role = await bot.buyer_role(interaction.guild, create=True)  
+        if role and role not in interaction.user.roles:  
+            await interaction.user.add_roles(role)  
+  
+        if panel_config:  
+            await interaction.response.send_message(f"✅ <@&{panel_config['buyerRoleId']}> role has been assigned to you!", ephemeral=True)  
+        else:  
+            await interaction.response.send_message('✅ Buyer role has been assigned to you!', ephemeral=True)  
+  
+    @discord.ui.button(label='Redeem Key', style=discord.ButtonStyle.secondary, emoji='🔑', custom_id='redeem_key')  
+    @metrics.instrument  
+    async def redeem_key(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        auth = await bot.get_auth(interaction)  
+        if not auth.is_guest:  
+            await interaction.response.send_message('❌ You are already logged in. You cannot redeem another key.', ephemeral=True)  
+            return  
+        if auth.user and (auth.is_active or auth.blacklist):  
+            await interaction.response.send_message('❌ You already have an active session. Please wait for it to expire or contact an admin.', ephemeral=True)  
+            return  
+  
+        await interaction.response.send_modal(RedeemKeyModal())  
+  
+    @discord.ui.button(label='Get Stats', style=discord.ButtonStyle.secondary, emoji='📊', custom_id='get_stats')  
+    @metrics.instrument  
+    async def get_stats(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        auth = await bot.get_auth(interaction, load_user=True)  
+        user_data = auth.user  
+        is_active = auth.is_active  
+        stats = await bot.db.get_stats_summary()  
+        blacklist_info = auth.blacklist  
+  
+        stats_message = f"**📊 Your Statistics**\n\n"  
+        stats_message += f"Your Status: {'✅ Active' if is_active else '❌ Inactive'}\n"  
+        stats_message += f"Your HWID: {user_data.get('hwid') or 'Not set'}\n"  
+        stats_message += f"Expires: <t:{int(user_data['expiresAt'] / 1000)}:R>\n"  
+  
+        if blacklist_info:  
+            stats_message += f"\n⛔️ **BLACKLISTED**\n"  
+            stats_message += f"Reason: {blacklist_info['reason']}\n"  
+            if blacklist_info['permanent']:  
+                stats_message += "Duration: Permanent\n"  
+            else:  
+                stats_message += f"Duration: Until <t:{int(blacklist_info['unblacklistAt'] / 1000)}:R>\n"  
   
-            user_data = bot.db.get_user(user_id)  
-            expires_timestamp = int(user_data['expiresAt'] / 1000)  
+        stats_message += f"\nTotal Active Users: {stats['activeUsers']}\n"  
+        stats_message += f"Total Keys: {stats['totalKeys']}\n"  
+        stats_message += f"Redeemed Keys: {stats['keysByStatus'].get(KEY_STATUS_REDEEMED, 0)}"  
   
-            embed = discord.Embed(  
-                title='🔑 Key Redeemed Successfully!',  
-                description='You have gained 24-hour access to the script!',  
-                color=0x00ff00  
-            )  
-            embed.add_field(name='Expires', value=f"Your access will expire <t:{expires_timestamp}:R>", inline=False)  
-            embed.set_footer(text='Enjoy using the script!')  
-            embed.timestamp = datetime.utcnow()  
+        await interaction.response.send_message(stats_message, ephemeral=True)  
+  
+    @discord.ui.button(label='Check Status', style=discord.ButtonStyle.secondary, emoji='ℹ️', custom_id='check_status')  
+    @metrics.instrument  
+    async def check_status(self, interaction: discord.Interaction, button: discord.ui.Button):  
+        auth = await bot.get_auth(interaction, load_user=True)  
+        user_data = auth.user  
+        is_active = auth.is_active  
+  
+        embed = discord.Embed(  
+            title='📊 Your Status',  
+            color=0x00ff00 if is_active else 0xff0000  
+        )  
+        embed.add_field(name='Status', value='✅ Active' if is_active else '❌ Inactive', inline=True)  
+        embed.add_field(name='Expires', value=f"<t:{int(user_data['expiresAt'] / 1000)}:R>", inline=True)  
+        embed.add_field(name='HWID', value=user_data.get('hwid') or 'Not set', inline=True)  
+        embed.timestamp = datetime.utcnow()  
+  
+        await interaction.response.send_message(embed=embed, ephemeral=True)  
   
-            await interaction.response.send_message(embed=embed, ephemeral=True)  
+def main():  
+    token = os.environ.get('DISCORD_BOT_TOKEN')  
+    if not token:  
+        raise Exception('DISCORD_BOT_TOKEN not found in environment variables')  
   
-token = os.environ.get('DISCORD_BOT_TOKEN')  
-if not token:  
-    raise Exception('DISCORD_BOT_TOKEN not found in environment variables')  
+    bot.run(token, root_logger=True)  
   
-bot.run(token)  
+if __name__ == '__main__':  
+    main()  
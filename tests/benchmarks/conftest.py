@@ -0,0 +1,42 @@
+import itertools  
+import pytest  
+  
+pytest.importorskip('pytest_benchmark')  
+  
+import bot as bot_module  
+from tests.fakes import FakeDatabase, SEED_USER_BASE  
+  
+@pytest.fixture(scope='module')  
+def dataset(replay, run, dataset_size):  
+    database = FakeDatabase.seeded(dataset_size)  
+    previous = run(replay.load_dataset(database))  
+    dms = replay.bot.dms  
+    global_bucket, user_rate, user_burst = dms.global_bucket, dms.user_rate, dms.user_burst  
+    dms.global_bucket = bot_module.TokenBucket(1e9, 1e9)  
+    dms.user_rate = dms.user_burst = 1e9  
+    dms.routes.clear()  
+    yield database  
+    run(replay.drain())  
+    dms.global_bucket, dms.user_rate, dms.user_burst = global_bucket, user_rate, user_burst  
+    dms.routes.clear()  
+    replay.restore(previous)  
+  
+@pytest.fixture  
+def redeemed_users(dataset):  
+    return itertools.cycle([int(user_id) for user_id in dataset.users])  
+  
+@pytest.fixture  
+def unused_keys(dataset):  
+    return iter([code for code, key in dataset.keys.items() if key['status'] == 'unused'])  
+  
+@pytest.fixture  
+def guests():  
+    return itertools.count(SEED_USER_BASE * 2)  
+  
+def record_percentiles(benchmark):  
+    data = sorted(benchmark.stats.stats.data)  
+    if not data:  
+        return  
+    benchmark.extra_info['p50_ms'] = round(data[len(data) // 2] * 1000, 3)  
+    benchmark.extra_info['p99_ms'] = round(data[min(len(data) - 1, int(len(data) * 0.99))] * 1000, 3)  
+    benchmark.extra_info['throughput_per_s'] = round(len(data) / sum(data), 1)  
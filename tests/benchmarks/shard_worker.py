@@ -0,0 +1,32 @@
+import os  
+import time  
+import asyncio  
+import tempfile  
+from tests.fakes import FakeDatabase, install  
+from tests.replay import Replay  
+  
+def run_shard(shard_id: int, rounds: int, dataset_size: int, barrier, results):  
+    os.environ.pop('SHARD_IDS', None)  
+    os.environ.pop('SHARD_COUNT', None)  
+    os.environ['LUARMOR_TEST_DIR'] = tempfile.mkdtemp(prefix=f'luarmor-shard{shard_id}-')  
+    install()  
+    import bot  
+  
+    loop = asyncio.new_event_loop()  
+    asyncio.set_event_loop(loop)  
+    replay = Replay(bot)  
+    loop.run_until_complete(replay.start())  
+    previous = loop.run_until_complete(replay.load_dataset(FakeDatabase.seeded(dataset_size)))  
+    users = [int(user_id) for user_id in replay.bot.db.db.users]  
+    payloads = [replay.component_payload('get_stats', users[i % len(users)]) for i in range(rounds)]  
+  
+    barrier.wait()  
+    started = time.perf_counter()  
+    for payload in payloads:  
+        loop.run_until_complete(replay.dispatch(payload))  
+    elapsed = time.perf_counter() - started  
+  
+    replay.restore(previous)  
+    loop.run_until_complete(replay.close())  
+    loop.close()  
+    results.put((shard_id, rounds, elapsed))  
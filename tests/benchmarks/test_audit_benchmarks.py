@@ -0,0 +1,30 @@
+import os  
+import asyncio  
+import pytest  
+import bot  
+from tests.benchmarks.conftest import record_percentiles  
+  
+@pytest.fixture  
+def journal(run, tmp_dir):  
+    journal = bot.AuditJournal(os.path.join(tmp_dir, 'audit.log'))  
+    run(journal.start())  
+    yield journal  
+    run(journal.close())  
+  
+def test_audit_append_burst(benchmark, run, journal):  
+    async def burst():  
+        await asyncio.gather(*(journal.append('whitelist', 1, user_id, '30 days') for user_id in range(100)))  
+  
+    benchmark.extra_info['records_per_round'] = 100  
+    benchmark.pedantic(lambda: run(burst()), rounds=20)  
+    record_percentiles(benchmark)  
+  
+def test_audit_history(benchmark, run, journal, dataset_size):  
+    async def fill():  
+        await asyncio.gather(*(journal.append('whitelist', user_id % 100, user_id) for user_id in range(dataset_size)))  
+  
+    run(fill())  
+    benchmark.extra_info['dataset_size'] = dataset_size  
+    records = benchmark(lambda: run(journal.history(7)))  
+    assert len(records) == min(20, dataset_size // 100)  
+    record_percentiles(benchmark)  
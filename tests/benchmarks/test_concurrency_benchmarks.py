@@ -0,0 +1,51 @@
+import time  
+import asyncio  
+import itertools  
+import pytest  
+import bot as bot_module  
+from tests.fakes import SEED_USER_BASE  
+from tests.benchmarks.conftest import record_percentiles  
+  
+WRITE_SECONDS = 0.002  
+  
+@pytest.fixture  
+def writers(request, loop, run, replay, dataset, monkeypatch):  
+    previous = replay.bot.db  
+    replay.bot.db = bot_module.AsyncDatabase(dataset, workers=4, bus=previous.bus)  
+    run(replay.bot.db.load_indexes())  
+    whitelist_user = dataset.whitelist_user  
+  
+    def slow_whitelist_user(*args):  
+        time.sleep(WRITE_SECONDS)  
+        return whitelist_user(*args)  
+  
+    monkeypatch.setattr(dataset, 'whitelist_user', slow_whitelist_user)  
+    users = itertools.count(SEED_USER_BASE * 3)  
+    stopped = asyncio.Event()  
+    writes = [0]  
+  
+    async def writer():  
+        while not stopped.is_set():  
+            user_id = str(next(users))  
+            await replay.bot.db.whitelist_user(user_id, f'user{user_id}', 1)  
+            writes[0] += 1  
+  
+    tasks = [loop.create_task(writer()) for _ in range(request.param)]  
+    yield writes  
+    stopped.set()  
+    run(asyncio.gather(*tasks))  
+    replay.bot.db.close()  
+    replay.bot.db = previous  
+  
+@pytest.mark.parametrize('writers', [0, 8, 32], indirect=True)  
+def test_get_stats_under_concurrent_writers(benchmark, run, replay, redeemed_users, writers, request):  
+    def setup():  
+        return (replay.component_payload('get_stats', next(redeemed_users)),), {}  
+  
+    def target(payload):  
+        run(replay.dispatch(payload))  
+  
+    benchmark.extra_info['writers'] = request.node.callspec.params['writers']  
+    benchmark.pedantic(target, setup=setup, rounds=100, warmup_rounds=1)  
+    record_percentiles(benchmark)  
+    benchmark.extra_info['writes'] = writers[0]  
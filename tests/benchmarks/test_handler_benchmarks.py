@@ -0,0 +1,32 @@
+from discord import app_commands  
+from tests.replay import OWNER_ID  
+from tests.benchmarks.conftest import record_percentiles  
+  
+ROUNDS = 100  
+  
+def bench(benchmark, run, replay, build, rounds: int = ROUNDS):  
+    def setup():  
+        return (build(),), {}  
+  
+    def target(payload):  
+        run(replay.dispatch(payload))  
+  
+    benchmark.extra_info['dataset_size'] = len(replay.bot.db.keys)  
+    benchmark.pedantic(target, setup=setup, rounds=rounds, warmup_rounds=1)  
+    record_percentiles(benchmark)  
+  
+def test_get_stats(benchmark, run, replay, redeemed_users):  
+    bench(benchmark, run, replay, lambda: replay.component_payload('get_stats', next(redeemed_users)))  
+  
+def test_get_script(benchmark, run, replay, redeemed_users):  
+    bench(benchmark, run, replay, lambda: replay.component_payload('get_script', next(redeemed_users)))  
+  
+def test_listkeys(benchmark, run, replay, dataset):  
+    status = app_commands.Choice(name='Unused', value='unused')  
+    bench(benchmark, run, replay, lambda: replay.slash_payload('listkeys', OWNER_ID, status=status))  
+  
+def test_genkeys(benchmark, run, replay, redeemed_users):  
+    bench(benchmark, run, replay, lambda: replay.slash_payload('genkeys', OWNER_ID, user=next(redeemed_users), amount=100, days=1), rounds=20)  
+  
+def test_redeem_key_modal(benchmark, run, replay, unused_keys, guests):  
+    bench(benchmark, run, replay, lambda: replay.modal_payload('redeem_key_modal', next(guests), {'key_input': next(unused_keys)}))  
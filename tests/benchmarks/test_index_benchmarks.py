@@ -0,0 +1,30 @@
+import pytest  
+import bot  
+from tests.test_key_index import build_index  
+from tests.benchmarks.conftest import record_percentiles  
+  
+@pytest.fixture(scope='module')  
+def index(dataset_size):  
+    return build_index(dataset_size)  
+  
+def test_key_index_load(benchmark, dataset_size):  
+    benchmark.extra_info['dataset_size'] = dataset_size  
+    benchmark.pedantic(build_index, args=(dataset_size,), rounds=5)  
+    record_percentiles(benchmark)  
+  
+def test_key_index_status_counts(benchmark, index):  
+    benchmark.extra_info['dataset_size'] = len(index)  
+    benchmark(index.status_counts)  
+    record_percentiles(benchmark)  
+  
+def test_key_index_page_last(benchmark, index):  
+    cursor = index.by_status[bot.KEY_STATUS_UNUSED][-26]  
+    benchmark.extra_info['dataset_size'] = len(index)  
+    page = benchmark(index.page, bot.KEY_STATUS_UNUSED, None, cursor)  
+    assert len(page['keys']) == 25  
+    record_percentiles(benchmark)  
+  
+def test_key_index_find(benchmark, index):  
+    benchmark.extra_info['dataset_size'] = len(index)  
+    benchmark(index.find, f'KEY-{len(index) - 1:06d}')  
+    record_percentiles(benchmark)  
@@ -0,0 +1,33 @@
+import itertools  
+import pytest  
+import bot  
+from tests.fakes import FakeHashedDatabase  
+from tests.benchmarks.conftest import record_percentiles  
+  
+@pytest.fixture(scope='module')  
+def login_db(dataset_size):  
+    database = FakeHashedDatabase.with_api_keys(dataset_size)  
+    db = bot.AsyncDatabase(database, api_key_secret='benchmark-secret')  
+    yield db  
+    db.close()  
+  
+def test_login(benchmark, run, login_db, dataset_size):  
+    users = itertools.count()  
+    keys = {}  
+  
+    def setup():  
+        user_id = str(next(users))  
+        keys[user_id] = run(login_db.create_api_key('manager', user_id))['apiKey']['apiKey']  
+        return (user_id,), {}  
+  
+    def target(user_id):  
+        assert run(login_db.login_with_api_key(user_id, 'user', keys[user_id]))['success']  
+  
+    benchmark.extra_info['issued_api_keys'] = dataset_size  
+    benchmark.pedantic(target, setup=setup, rounds=200, warmup_rounds=1)  
+    record_percentiles(benchmark)  
+  
+def test_is_logged_in(benchmark, run, login_db):  
+    login_db.db.sessions['1'] = login_db.db.now() + 86400000  
+    benchmark(lambda: run(login_db.is_logged_in('1')))  
+    record_percentiles(benchmark)  
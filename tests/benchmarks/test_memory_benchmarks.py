@@ -0,0 +1,70 @@
+import gc  
+import tracemalloc  
+import discord  
+import pytest  
+import bot as bot_module  
+from tests.fakes import FakeConfig  
+from tests.replay import GUILD_ID, OWNER_ID, member_payload, role_payload, channel_payload  
+  
+GUILD_MEMBERS = 100000  
+MEMBER_BASE = 600000000000000000  
+  
+@pytest.fixture(scope='module')  
+def cache_settings():  
+    lean = bot_module.bot  
+    assert FakeConfig.LEAN_INTENTS and lean.config.LEAN_INTENTS  
+    FakeConfig.LEAN_INTENTS = False  
+    try:  
+        full = bot_module.LuarmorBot()  
+    finally:  
+        FakeConfig.LEAN_INTENTS = True  
+    full.db.close()  
+    return {  
+        True: (lean.intents, lean._connection.member_cache_flags),  
+        False: (full.intents, full._connection.member_cache_flags)  
+    }  
+  
+@pytest.fixture(scope='module')  
+def guild_payload():  
+    return {  
+        'id': str(GUILD_ID),  
+        'name': 'Large Guild',  
+        'owner_id': str(OWNER_ID),  
+        'roles': [role_payload(GUILD_ID, '@everyone', 0)],  
+        'channels': [channel_payload()],  
+        'members': [member_payload(MEMBER_BASE + i) for i in range(GUILD_MEMBERS)],  
+        'member_count': GUILD_MEMBERS,  
+        'emojis': [],  
+        'stickers': [],  
+        'features': [],  
+        'unavailable': False  
+    }  
+  
+resident = {}  
+  
+@pytest.mark.parametrize('lean', [False, True], ids=['full', 'lean'])  
+def test_guild_member_cache_memory(benchmark, guild_payload, cache_settings, lean):  
+    intents, member_cache_flags = cache_settings[lean]  
+  
+    def load():  
+        client = discord.Client(intents=intents, member_cache_flags=member_cache_flags)  
+        gc.collect()  
+        tracemalloc.start()  
+        try:  
+            before = tracemalloc.get_traced_memory()[0]  
+            guild = client._connection._add_guild_from_data(guild_payload)  
+            gc.collect()  
+            used = tracemalloc.get_traced_memory()[0] - before  
+        finally:  
+            tracemalloc.stop()  
+        return guild, used  
+  
+    guild, used = benchmark.pedantic(load, rounds=1, iterations=1)  
+    resident['lean' if lean else 'full'] = used  
+    benchmark.extra_info['members'] = GUILD_MEMBERS  
+    benchmark.extra_info['cached_members'] = len(guild.members)  
+    benchmark.extra_info['resident_bytes'] = used  
+    assert len(guild.members) == (0 if lean else GUILD_MEMBERS)  
+    if lean and 'full' in resident:  
+        benchmark.extra_info['saved_bytes'] = resident['full'] - used  
+        assert used * 10 < resident['full']  
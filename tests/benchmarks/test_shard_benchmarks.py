@@ -0,0 +1,47 @@
+import os  
+import queue  
+import multiprocessing  
+import pytest  
+from tests.benchmarks.shard_worker import run_shard  
+  
+ROUNDS = 2000  
+SHARDS = [1, 2, 4]  
+  
+throughputs = {}  
+  
+def run_shards(shards: int, dataset_size: int) -> list:  
+    context = multiprocessing.get_context('spawn')  
+    barrier = context.Barrier(shards)  
+    results = context.Queue()  
+    processes = [context.Process(target=run_shard, args=(shard_id, ROUNDS, dataset_size, barrier, results)) for shard_id in range(shards)]  
+    for process in processes:  
+        process.start()  
+    collected = []  
+    try:  
+        while len(collected) < shards:  
+            try:  
+                collected.append(results.get(timeout=1))  
+            except queue.Empty:  
+                failed = [process for process in processes if process.exitcode]  
+                if failed:  
+                    raise RuntimeError(f'shard process exited with code {failed[0].exitcode}')  
+        return collected  
+    finally:  
+        for process in processes:  
+            process.join(timeout=60)  
+  
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason='multi-process throughput needs at least two cpus')  
+@pytest.mark.parametrize('shards', SHARDS)  
+def test_sharded_interaction_throughput(benchmark, shards, dataset_size):  
+    if shards > os.cpu_count():  
+        pytest.skip(f'{shards} shards need {shards} cpus')  
+  
+    results = benchmark.pedantic(run_shards, args=(shards, dataset_size), rounds=1, iterations=1)  
+    throughput = sum(rounds for _, rounds, _ in results) / max(elapsed for _, _, elapsed in results)  
+    throughputs[shards] = throughput  
+    benchmark.extra_info['shards'] = shards  
+    benchmark.extra_info['throughput_per_s'] = round(throughput, 1)  
+    benchmark.extra_info['per_shard_per_s'] = round(throughput / shards, 1)  
+    if 1 in throughputs:  
+        benchmark.extra_info['scaling'] = round(throughput / throughputs[1], 2)  
+    assert len(results) == shards  
@@ -0,0 +1,25 @@
+import os  
+import pytest  
+import bot  
+from tests.test_key_index import build_index  
+from tests.benchmarks.conftest import record_percentiles  
+  
+@pytest.fixture(scope='module')  
+def snapshot(tmp_path_factory, dataset_size):  
+    path = str(tmp_path_factory.mktemp('snapshot') / 'index.snapshot')  
+    bot.save_index_snapshot(path, build_index(dataset_size), {str(user_id): bot.now_ms() for user_id in range(dataset_size // 2)})  
+    return path  
+  
+def test_snapshot_load(benchmark, snapshot, dataset_size):  
+    benchmark.extra_info['dataset_size'] = dataset_size  
+    benchmark.extra_info['snapshot_bytes'] = os.path.getsize(snapshot)  
+    index, _, _ = benchmark.pedantic(bot.load_index_snapshot, args=(snapshot,), rounds=10)  
+    assert len(index) == dataset_size  
+    record_percentiles(benchmark)  
+  
+def test_snapshot_save(benchmark, tmp_path, dataset_size):  
+    index = build_index(dataset_size)  
+    path = str(tmp_path / 'index.snapshot')  
+    benchmark.extra_info['dataset_size'] = dataset_size  
+    benchmark.pedantic(bot.save_index_snapshot, args=(path, index, {}), rounds=5)  
+    record_percentiles(benchmark)  
@@ -0,0 +1,50 @@
+import os  
+import asyncio  
+import tempfile  
+import pytest  
+  
+os.environ.setdefault('LUARMOR_TEST_DIR', tempfile.mkdtemp(prefix='luarmor-'))  
+os.environ.pop('SHARD_IDS', None)  
+os.environ.pop('SHARD_COUNT', None)  
+  
+from tests.fakes import install  
+  
+install()  
+  
+import bot as bot_module  
+from tests.replay import Replay  
+  
+def pytest_addoption(parser):  
+    parser.addoption('--dataset-size', action='append', type=int, default=None,  
+                     help='number of keys/users seeded for handler benchmarks (repeatable, default: 1000)')  
+  
+def pytest_generate_tests(metafunc):  
+    if 'dataset_size' in metafunc.fixturenames:  
+        metafunc.parametrize('dataset_size', metafunc.config.getoption('dataset_size') or [1000], scope='module')  
+  
+@pytest.fixture(scope='session')  
+def loop():  
+    loop = asyncio.new_event_loop()  
+    asyncio.set_event_loop(loop)  
+    yield loop  
+    tasks = asyncio.all_tasks(loop)  
+    for task in tasks:  
+        task.cancel()  
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))  
+    loop.run_until_complete(loop.shutdown_asyncgens())  
+    loop.close()  
+  
+@pytest.fixture(scope='session')  
+def run(loop):  
+    return loop.run_until_complete  
+  
+@pytest.fixture(scope='session')  
+def replay(run):  
+    replay = Replay(bot_module)  
+    run(replay.start())  
+    yield replay  
+    run(replay.close())  
+  
+@pytest.fixture  
+def tmp_dir(tmp_path):  
+    return str(tmp_path)  
@@ -0,0 +1,189 @@
+import os  
+import sys  
+import time  
+import types  
+import secrets  
+import tempfile  
+import threading  
+  
+SEED_USER_BASE = 500000000000000000  
+  
+class FakeDatabase:  
+    def __init__(self):  
+        self.lock = threading.RLock()  
+        self.users = {}  
+        self.keys = {}  
+        self.keys_by_user = {}  
+        self.owners = {}  
+        self.sessions = {}  
+        self.api_keys = {}  
+        self.blacklist = {}  
+        self.panel = None  
+        self.calls = 0  
+  
+    @classmethod  
+    def seeded(cls, size: int, created_by: str = 'seed'):  
+        db = cls()  
+        now = db.now()  
+        for i in range(size):  
+            code = f'SEED-{i:08d}'  
+            db.keys[code] = {'code': code, 'duration': 30, 'status': 'unused', 'createdBy': created_by, 'createdAt': now + i}  
+            if i % 2:  
+                user_id = str(SEED_USER_BASE + i)  
+                db.keys[code].update(status='redeemed', redeemedBy=user_id)  
+                db.keys_by_user[user_id] = code  
+                db.users[user_id] = {'userId': user_id, 'username': f'user{user_id}', 'status': 'active', 'expiresAt': now + 86400000, 'hwid': None}  
+        return db  
+  
+    def now(self) -> int:  
+        return int(time.time() * 1000)  
+  
+    def is_owner(self, user_id):  
+        self.calls += 1  
+        return user_id in self.owners  
+  
+    def add_owner(self, user_id, username, added_by):  
+        self.owners[user_id] = username  
+        return {'success': True}  
+  
+    def remove_owner(self, user_id, username, removed_by):  
+        self.owners.pop(user_id, None)  
+        return {'success': True}  
+  
+    def create_api_key(self, created_by, user_id):  
+        api_key = secrets.token_hex(25)  
+        self.api_keys[api_key] = user_id  
+        return {'success': True, 'apiKey': {'apiKey': api_key}}  
+  
+    def login_with_api_key(self, user_id, username, api_key):  
+        self.calls += 1  
+        if self.api_keys.get(api_key) != user_id:  
+            return {'success': False, 'error': 'Invalid API key'}  
+        self.sessions[user_id] = self.now() + 86400000  
+        return {'success': True}  
+  
+    def is_logged_in(self, user_id):  
+        self.calls += 1  
+        expires_at = self.sessions.get(user_id)  
+        return expires_at is not None and expires_at > self.now()  
+  
+    def get_panel_config(self):  
+        return self.panel  
+  
+    def set_panel_config(self, channel_id, script, buyer_role_id, manager_role_id):  
+        self.panel = {'channelId': channel_id, 'scriptLoadstring': script, 'buyerRoleId': buyer_role_id, 'managerRoleId': manager_role_id}  
+        return {'success': True}  
+  
+    def set_panel_message_id(self, message_id):  
+        self.panel['messageId'] = message_id  
+        return {'success': True}  
+  
+    def whitelist_user(self, user_id, username, days):  
+        self.users[user_id] = {'userId': user_id, 'username': username, 'status': 'active', 'expiresAt': self.now() + days * 86400000, 'hwid': None}  
+        return {'success': True}  
+  
+    def blacklist_user(self, user_id, username, days, reason):  
+        self.blacklist[user_id] = {'reason': reason, 'permanent': days == 0, 'unblacklistAt': None if days == 0 else self.now() + days * 86400000}  
+        return {'success': True}  
+  
+    def is_blacklisted(self, user_id):  
+        info = self.blacklist.get(user_id)  
+        if info and not info['permanent'] and info['unblacklistAt'] < self.now():  
+            del self.blacklist[user_id]  
+            return False  
+        return info is not None  
+  
+    def get_blacklist_info(self, user_id):  
+        return self.blacklist.get(user_id) if self.is_blacklisted(user_id) else None  
+  
+    def get_user(self, user_id):  
+        self.calls += 1  
+        return self.users.get(user_id)  
+  
+    def is_user_active(self, user_id):  
+        user = self.users.get(user_id)  
+        if not user:  
+            return False  
+        if user['expiresAt'] < self.now():  
+            user['status'] = 'expired'  
+        return user['status'] == 'active' and not self.is_blacklisted(user_id)  
+  
+    def get_all_active_users(self):  
+        return [user for user in self.users.values() if self.is_user_active(user['userId'])]  
+  
+    def reset_hwid(self, user_id, reset_by=None):  
+        if user_id not in self.users:  
+            return {'success': False, 'error': 'User not found'}  
+        self.users[user_id]['hwid'] = None  
+        return {'success': True}  
+  
+    def create_key(self, code, days, created_by):  
+        if code in self.keys:  
+            return {'success': False, 'error': 'Key already exists'}  
+        self.keys[code] = {'code': code, 'duration': days, 'status': 'unused', 'createdBy': created_by, 'createdAt': self.now()}  
+        return {'success': True}  
+  
+    def get_all_keys(self):  
+        return list(self.keys.values())  
+  
+    def get_key_for_user(self, user_id):  
+        return self.keys_by_user.get(user_id)  
+  
+    def redeem_key(self, user_id, username, code):  
+        with self.lock:  
+            key = self.keys.get(code)  
+            if not key:  
+                return {'success': False, 'error': 'Invalid key'}  
+            if key['status'] != 'unused':  
+                return {'success': False, 'error': 'Key already redeemed'}  
+            time.sleep(0)  
+            key['status'] = 'redeemed'  
+            key['redeemedBy'] = user_id  
+            self.keys_by_user[user_id] = code  
+            self.users[user_id] = {'userId': user_id, 'username': username, 'status': 'active', 'expiresAt': self.now() + 86400000, 'hwid': None}  
+            self.sessions[user_id] = self.now() + 86400000  
+            return {'success': True}  
+  
+    def seed_demo_keys(self):  
+        for i in range(1, 6):  
+            self.create_key(f'DEMO-KEY-{i}', 1, 'system')  
+  
+class FakeHashedDatabase(FakeDatabase):  
+    def __init__(self):  
+        super().__init__()  
+        self.api_key_hashes = {}  
+  
+    @classmethod  
+    def with_api_keys(cls, size: int):  
+        db = cls()  
+        for i in range(size):  
+            db.api_key_hashes[secrets.token_hex(32)] = str(SEED_USER_BASE + i)  
+        return db  
+  
+    def create_api_key_hash(self, created_by, user_id, api_key_hash):  
+        self.api_key_hashes[api_key_hash] = user_id  
+        return {'success': True, 'apiKey': {'userId': user_id}}  
+  
+    def login_with_api_key_hash(self, user_id, username, api_key_hash):  
+        self.calls += 1  
+        if self.api_key_hashes.get(api_key_hash) != user_id:  
+            return {'success': False, 'error': 'Invalid API key'}  
+        self.sessions[user_id] = self.now() + 86400000  
+        return {'success': True}  
+  
+class FakeConfig:  
+    SCRIPT_CONTENT = 'loadstring(game:HttpGet("https://example.invalid/loader?key={{KEY}}"))()'  
+    ENABLE_SELF_HWID_RESET = True  
+    LEAN_INTENTS = True  
+  
+    def __init__(self):  
+        directory = os.environ.get('LUARMOR_TEST_DIR') or tempfile.mkdtemp(prefix='luarmor-')  
+        self.STATE_FILE = os.path.join(directory, 'bot_state.json')  
+        self.AUDIT_LOG_FILE = os.path.join(directory, 'audit.log')  
+        self.INDEX_SNAPSHOT_FILE = os.path.join(directory, 'index.snapshot')  
+  
+def install():  
+    sys.modules['database_py'] = types.ModuleType('database_py')  
+    sys.modules['database_py'].Database = FakeDatabase  
+    sys.modules['config_py'] = types.ModuleType('config_py')  
+    sys.modules['config_py'].Config = FakeConfig  
@@ -0,0 +1,303 @@
+import json  
+import asyncio  
+import itertools  
+from collections import defaultdict  
+import discord  
+from discord import app_commands  
+from discord.webhook import async_ as webhook_async  
+  
+APPLICATION_ID = 900000000000000001  
+GUILD_ID = 900000000000000002  
+CHANNEL_ID = 900000000000000003  
+BUYER_ROLE_ID = 900000000000000004  
+MANAGER_ROLE_ID = 900000000000000005  
+BOT_USER_ID = 900000000000000006  
+OWNER_ID = 1416252754925584435  
+  
+OPTION_USER = (discord.AppCommandOptionType.user, discord.AppCommandOptionType.mentionable)  
+  
+snowflakes = itertools.count(1000000000000000000)  
+  
+def user_payload(user_id: int, name: str = None) -> dict:  
+    return {'id': str(user_id), 'username': name or f'user{user_id}', 'discriminator': '0', 'global_name': None, 'avatar': None}  
+  
+def member_payload(user_id: int, roles=(), name: str = None) -> dict:  
+    return {  
+        'user': user_payload(user_id, name),  
+        'roles': [str(role_id) for role_id in roles],  
+        'joined_at': '2024-01-01T00:00:00+00:00',  
+        'deaf': False,  
+        'mute': False,  
+        'flags': 0,  
+        'permissions': '0'  
+    }  
+  
+def role_payload(role_id: int, name: str, position: int = 1) -> dict:  
+    return {'id': str(role_id), 'name': name, 'color': 0, 'hoist': False, 'position': position, 'permissions': '0', 'managed': False, 'mentionable': False, 'flags': 0}  
+  
+def channel_payload(channel_id: int = CHANNEL_ID, name: str = 'panel') -> dict:  
+    return {'id': str(channel_id), 'type': 0, 'guild_id': str(GUILD_ID), 'name': name, 'position': 0, 'permission_overwrites': [], 'nsfw': False, 'parent_id': None}  
+  
+def message_payload(channel_id: int, content: str = None, embeds=None, author_id: int = BOT_USER_ID) -> dict:  
+    return {  
+        'id': str(next(snowflakes)),  
+        'channel_id': str(channel_id),  
+        'author': user_payload(author_id),  
+        'content': content or '',  
+        'timestamp': '2024-01-01T00:00:00+00:00',  
+        'edited_timestamp': None,  
+        'tts': False,  
+        'mention_everyone': False,  
+        'mentions': [],  
+        'mention_roles': [],  
+        'attachments': [],  
+        'embeds': embeds or [],  
+        'pinned': False,  
+        'type': 0,  
+        'flags': 0  
+    }  
+  
+class StubHTTP:  
+    def __init__(self):  
+        self.calls = []  
+        self.handlers = {}  
+  
+    async def request(self, route, **kwargs):  
+        self.calls.append((route.method, route.path, route, kwargs))  
+        handler = self.handlers.get((route.method, route.path))  
+        if handler is not None:  
+            result = handler(route, **kwargs)  
+            return await result if asyncio.iscoroutine(result) else result  
+  
+        if (route.method, route.path) == ('POST', '/users/@me/channels'):  
+            recipient_id = int(kwargs['json']['recipient_id'])  
+            return {'id': str(next(snowflakes)), 'type': 1, 'recipients': [user_payload(recipient_id)], 'last_message_id': None}  
+        if (route.method, route.path) == ('POST', '/channels/{channel_id}/messages'):  
+            payload = kwargs.get('json') or {}  
+            return message_payload(route.channel_id, payload.get('content'), payload.get('embeds'))  
+        if (route.method, route.path) == ('POST', '/guilds/{guild_id}/roles'):  
+            return role_payload(next(snowflakes), kwargs['json'].get('name', 'role'))  
+        if route.method == 'PUT' and route.path.startswith('/applications/'):  
+            return []  
+        if (route.method, route.path) == ('GET', '/guilds/{guild_id}/members'):  
+            return []  
+        return None  
+  
+    def count(self, method: str, path: str) -> int:  
+        return sum(1 for call in self.calls if call[0] == method and call[1] == path)  
+  
+class StubWebhookAdapter(webhook_async.AsyncWebhookAdapter):  
+    def __init__(self):  
+        super().__init__()  
+        self.responses = defaultdict(list)  
+  
+    async def request(self, route, session=None, **kwargs):  
+        payload = kwargs.get('payload')  
+        if payload is None and kwargs.get('multipart'):  
+            payload = json.loads(kwargs['multipart'][0]['value'])  
+        payload = payload or {}  
+        self.responses[route.webhook_token].append((route.method, route.path, payload))  
+  
+        if route.path.endswith('/callback'):  
+            return {'interaction': {'id': str(route.webhook_id), 'type': payload.get('type'), 'response_message_id': str(next(snowflakes))}}  
+        data = payload.get('data', payload)  
+        return message_payload(CHANNEL_ID, data.get('content'), data.get('embeds'))  
+  
+class Reply:  
+    def __init__(self, interaction: discord.Interaction, adapter: StubWebhookAdapter):  
+        self.interaction = interaction  
+        self.adapter = adapter  
+  
+    @property  
+    def responses(self) -> list:  
+        return self.adapter.responses[self.interaction.token]  
+  
+    @property  
+    def messages(self) -> list:  
+        return [payload.get('data', payload) for _, _, payload in self.responses]  
+  
+    @property  
+    def content(self) -> str:  
+        messages = self.messages  
+        return messages[0].get('content') or '' if messages else ''  
+  
+    @property  
+    def embeds(self) -> list:  
+        return [embed for message in self.messages for embed in message.get('embeds') or ()]  
+  
+    @property  
+    def text(self) -> str:  
+        parts = []  
+        for message in self.messages:  
+            parts.append(message.get('content') or '')  
+            for embed in message.get('embeds') or ():  
+                parts.append(json.dumps(embed, ensure_ascii=False))  
+        return '\n'.join(parts)  
+  
+class Replay:  
+    def __init__(self, module):  
+        self.module = module  
+        self.bot = module.bot  
+        self.http = StubHTTP()  
+        self.adapter = StubWebhookAdapter()  
+        self.errors = []  
+        self.guild = None  
+        webhook_async.async_context.set(self.adapter)  
+  
+    async def start(self):  
+        bot = self.bot  
+        bot.http.request = self.http.request  
+        bot.instrument_http()  
+        await bot._async_setup_hook()  
+        bot._connection.application_id = APPLICATION_ID  
+        bot._connection.user = discord.ClientUser(state=bot._connection, data=user_payload(BOT_USER_ID, 'luarmor'))  
+        self.guild = bot._connection._add_guild_from_data({  
+            'id': str(GUILD_ID),  
+            'name': 'Replay Guild',  
+            'owner_id': str(OWNER_ID),  
+            'roles': [  
+                role_payload(GUILD_ID, '@everyone', 0),  
+                role_payload(BUYER_ROLE_ID, 'Buyer'),  
+                role_payload(MANAGER_ROLE_ID, 'Manager', 2)  
+            ],  
+            'channels': [channel_payload()],  
+            'members': [],  
+            'member_count': 0,  
+            'emojis': [],  
+            'stickers': [],  
+            'features': [],  
+            'unavailable': False  
+        })  
+  
+        async def on_tree_error(interaction, error):  
+            self.errors.append(error)  
+  
+        bot.tree.on_error = on_tree_error  
+        await bot.setup_hook()  
+        bot.panel_view.on_error = self.on_view_error  
+  
+    async def load_dataset(self, database, workers: int = None):  
+        previous = self.bot.db  
+        self.bot.db = self.module.AsyncDatabase(database, workers=workers or previous.executor._max_workers, bus=previous.bus)  
+        await self.bot.db.load_indexes()  
+        return previous  
+  
+    def restore(self, previous):  
+        self.bot.db.close()  
+        self.bot.db = previous  
+  
+    async def on_view_error(self, interaction, error, item=None):  
+        self.errors.append(error)  
+  
+    async def close(self):  
+        bot = self.bot  
+        if bot.expiry_task:  
+            bot.expiry_task.cancel()  
+            await asyncio.gather(bot.expiry_task, return_exceptions=True)  
+        await bot.dms.stop()  
+        await bot.roles.stop()  
+        await bot.audit.close()  
+        bot.db.close()  
+  
+    def raise_errors(self):  
+        if self.errors:  
+            errors, self.errors = self.errors, []  
+            raise errors[0]  
+  
+    def payload(self, type: int, user_id: int, data: dict, roles=(), name: str = None, message: dict = None) -> dict:  
+        interaction_id = next(snowflakes)  
+        payload = {  
+            'id': str(interaction_id),  
+            'application_id': str(APPLICATION_ID),  
+            'type': type,  
+            'token': f'token-{interaction_id}',  
+            'version': 1,  
+            'guild_id': str(GUILD_ID),  
+            'channel_id': str(CHANNEL_ID),  
+            'channel': channel_payload(),  
+            'member': member_payload(user_id, roles, name),  
+            'data': data,  
+            'locale': 'en-US',  
+            'guild_locale': 'en-US',  
+            'app_permissions': '0',  
+            'entitlements': [],  
+            'authorizing_integration_owners': {'0': str(GUILD_ID)},  
+            'context': 0,  
+            'attachment_size_limit': 8 * 1024 * 1024  
+        }  
+        if message is not None:  
+            payload['message'] = message  
+        return payload  
+  
+    def slash_payload(self, name: str, user_id: int, roles=(), **options) -> dict:  
+        command = self.bot.tree.get_command(name)  
+        parameters = {parameter.name: parameter for parameter in command.parameters}  
+        resolved = defaultdict(dict)  
+        data_options = []  
+        for option, value in options.items():  
+            parameter = parameters[option]  
+            if isinstance(value, app_commands.Choice):  
+                value = value.value  
+            if parameter.type in OPTION_USER:  
+                resolved['users'][str(value)] = user_payload(value)  
+                resolved['members'][str(value)] = {key: item for key, item in member_payload(value).items() if key != 'user'}  
+                value = str(value)  
+            elif parameter.type is discord.AppCommandOptionType.role:  
+                role = self.guild.get_role(value)  
+                resolved['roles'][str(value)] = role_payload(value, role.name if role else f'role{value}')  
+                value = str(value)  
+            elif parameter.type is discord.AppCommandOptionType.channel:  
+                resolved['channels'][str(value)] = {**channel_payload(value), 'permissions': '0'}  
+                value = str(value)  
+            elif parameter.type is discord.AppCommandOptionType.attachment:  
+                resolved['attachments'][str(value['id'])] = value  
+                value = str(value['id'])  
+            data_options.append({'name': option, 'type': parameter.type.value, 'value': value})  
+  
+        data = {'id': str(next(snowflakes)), 'name': name, 'type': 1, 'options': data_options}  
+        if resolved:  
+            data['resolved'] = dict(resolved)  
+        return self.payload(2, user_id, data, roles)  
+  
+    def component_payload(self, custom_id: str, user_id: int, roles=()) -> dict:  
+        message = message_payload(CHANNEL_ID)  
+        return self.payload(3, user_id, {'custom_id': custom_id, 'component_type': 2}, roles, message=message)  
+  
+    def modal_payload(self, custom_id: str, user_id: int, values: dict, roles=()) -> dict:  
+        components = [{'type': 1, 'components': [{'type': 4, 'custom_id': key, 'value': value}]} for key, value in values.items()]  
+        return self.payload(5, user_id, {'custom_id': custom_id, 'components': components}, roles)  
+  
+    def interaction(self, payload: dict) -> discord.Interaction:  
+        return discord.Interaction(data=payload, state=self.bot._connection)  
+  
+    async def dispatch(self, payload: dict) -> Reply:  
+        interaction = self.interaction(payload)  
+        await self.bot.on_interaction(interaction)  
+        if payload['type'] == 2:  
+            await self.bot.tree._call(interaction)  
+        elif payload['type'] == 3:  
+            custom_id = payload['data']['custom_id']  
+            view = self.bot.panel_view  
+            item = next(child for child in view.children if getattr(child, 'custom_id', None) == custom_id)  
+            await view._scheduled_task(item, interaction)  
+        elif payload['type'] == 5:  
+            custom_id = payload['data']['custom_id']  
+            modal = self.bot._connection._view_store._modals.get(custom_id)  
+            if modal is None:  
+                modal = self.module.RedeemKeyModal()  
+            await modal._dispatch_submit(interaction, payload['data']['components'], {})  
+        self.raise_errors()  
+        return Reply(interaction, self.adapter)  
+  
+    async def slash(self, name: str, user_id: int, roles=(), **options) -> Reply:  
+        return await self.dispatch(self.slash_payload(name, user_id, roles, **options))  
+  
+    async def button(self, custom_id: str, user_id: int, roles=()) -> Reply:  
+        return await self.dispatch(self.component_payload(custom_id, user_id, roles))  
+  
+    async def modal(self, custom_id: str, user_id: int, values: dict, roles=()) -> Reply:  
+        return await self.dispatch(self.modal_payload(custom_id, user_id, values, roles))  
+  
+    async def drain(self):  
+        await self.bot.dms.queue.join()  
+        await self.bot.roles.queue.join()  
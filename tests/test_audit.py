@@ -0,0 +1,98 @@
+import os  
+import asyncio  
+import bot  
+  
+def test_audit_codec_round_trip():  
+    record = bot.encode_audit_record(1700000000000, 'blacklist', '1', '2', 'spam ✨')  
+    (length,) = bot.AUDIT_LENGTH.unpack_from(record)  
+    assert length == len(record) - bot.AUDIT_LENGTH.size  
+    assert bot.decode_audit_record(record[bot.AUDIT_LENGTH.size:]) == {'at': 1700000000000, 'action': 'blacklist', 'actor': '1', 'target': '2', 'detail': 'spam ✨'}  
+  
+def test_audit_codec_truncates_long_fields():  
+    record = bot.encode_audit_record(0, 'whitelist', '1', '', 'x' * 70000)  
+    decoded = bot.decode_audit_record(record[bot.AUDIT_LENGTH.size:])  
+    assert len(decoded['detail']) == 0xffff and decoded['target'] == ''  
+  
+def test_audit_group_commit(run, tmp_dir, monkeypatch):  
+    fsyncs = []  
+    fsync = os.fsync  
+    monkeypatch.setattr(bot.os, 'fsync', lambda fd: fsyncs.append(fd) or fsync(fd))  
+    journal = bot.AuditJournal(os.path.join(tmp_dir, 'audit.log'))  
+    run(journal.start())  
+  
+    async def burst():  
+        return await asyncio.gather(*(journal.append('whitelist', 1, user_id, '30 days') for user_id in range(100)))  
+  
+    assert all(run(burst()))  
+    assert len(fsyncs) <= 3  
+    assert [record['target'] for record in run(journal.history(1, limit=100))] == [str(user_id) for user_id in reversed(range(100))]  
+    run(journal.close())  
+  
+def test_audit_offsets_with_shared_file(run, tmp_dir):  
+    path = os.path.join(tmp_dir, 'audit.log')  
+    first, second = bot.AuditJournal(path), bot.AuditJournal(path)  
+    run(first.start())  
+    run(second.start())  
+    for i in range(5):  
+        assert run(first.append('whitelist', 10, 100 + i, f'first {i}'))  
+        assert run(second.append('blacklist', 20, 200 + i, f'second {i}'))  
+  
+    assert [record['detail'] for record in run(first.history(10))] == [f'first {i}' for i in reversed(range(5))]  
+    assert [record['detail'] for record in run(second.history(20))] == [f'second {i}' for i in reversed(range(5))]  
+    assert [record['detail'] for record in run(first.history(203))] == ['second 3']  
+    assert [record['detail'] for record in run(second.history(101))] == ['first 1']  
+    run(first.close())  
+    run(second.close())  
+  
+    reloaded = bot.AuditJournal(path)  
+    run(reloaded.start())  
+    assert len(run(reloaded.history(10))) == 5 and len(run(reloaded.history(20))) == 5  
+    run(reloaded.close())  
+  
+def test_audit_failed_write_keeps_offsets(run, tmp_dir, monkeypatch):  
+    journal = bot.AuditJournal(os.path.join(tmp_dir, 'audit.log'))  
+    run(journal.start())  
+    assert run(journal.append('whitelist', 1, 2, 'ok'))  
+    size = journal.size  
+  
+    def fail(fd):  
+        raise OSError('disk full')  
+  
+    monkeypatch.setattr(bot.os, 'fsync', fail)  
+    assert not run(journal.append('whitelist', 1, 3, 'failed'))  
+    assert journal.size == size  
+    monkeypatch.undo()  
+  
+    assert run(journal.append('whitelist', 1, 4, 'after'))  
+    assert [record['detail'] for record in run(journal.history(4))] == ['after']  
+    assert [record['detail'] for record in run(journal.history(2))] == ['ok']  
+    run(journal.close())  
+  
+def test_audit_close_waits_for_in_flight_batch(run, tmp_dir):  
+    path = os.path.join(tmp_dir, 'audit.log')  
+    journal = bot.AuditJournal(path)  
+    run(journal.start())  
+    write = journal.write  
+  
+    def slow_write(records):  
+        import time  
+        time.sleep(0.05)  
+        return write(records)  
+  
+    journal.write = slow_write  
+  
+    async def append_then_close():  
+        appends = [asyncio.create_task(journal.append('whitelist', 1, user_id)) for user_id in range(10)]  
+        await asyncio.sleep(journal.flush_interval * 2)  
+        late = asyncio.create_task(journal.append('whitelist', 1, 99))  
+        await asyncio.sleep(0)  
+        await journal.close()  
+        return await asyncio.gather(*appends, late)  
+  
+    assert all(run(append_then_close()))  
+    reloaded = bot.AuditJournal(path)  
+    run(reloaded.start())  
+    assert sorted(int(record['target']) for record in run(reloaded.history(1, limit=100))) == list(range(10)) + [99]  
+    assert os.path.getsize(path) == reloaded.size  
+    run(reloaded.close())  
+    assert not run(journal.append('whitelist', 1, 100))  
@@ -0,0 +1,26 @@
+import bot  
+  
+def test_ttl_cache_drops_stale_entries(monkeypatch):  
+    now = [1000.0]  
+    monkeypatch.setattr(bot.time, 'monotonic', lambda: now[0])  
+    cache = bot.TTLCache(30)  
+    cache.set('a', True)  
+    assert cache.get('a') is True  
+    now[0] += 31  
+    assert cache.get('a') is bot.MISSING  
+    assert len(cache) == 0  
+  
+def test_ttl_cache_evicts_least_recently_used():  
+    cache = bot.TTLCache(30, max_size=2)  
+    cache.set('a', 1)  
+    cache.set('b', 2)  
+    cache.get('a')  
+    cache.set('c', 3)  
+    assert cache.get('b') is bot.MISSING  
+    assert cache.get('a') == 1 and cache.get('c') == 3  
+    assert len(cache) == 2  
+  
+def test_ttl_cache_falsy_values_are_cached():  
+    cache = bot.TTLCache(30)  
+    cache.set('owner', False)  
+    assert cache.get('owner') is False  
@@ -0,0 +1,36 @@
+import time  
+import asyncio  
+import bot  
+from tests.fakes import FakeDatabase  
+  
+class SlowDatabase(FakeDatabase):  
+    def whitelist_user(self, user_id, username, days):  
+        time.sleep(0.05)  
+        return super().whitelist_user(user_id, username, days)  
+  
+def test_slow_writes_do_not_block_the_loop(run):  
+    db = bot.AsyncDatabase(SlowDatabase(), workers=4)  
+  
+    async def probe(done):  
+        lag = 0  
+        while not done.is_set():  
+            started = time.perf_counter()  
+            await asyncio.sleep(0.001)  
+            lag = max(lag, time.perf_counter() - started - 0.001)  
+        return lag  
+  
+    async def scenario():  
+        done = asyncio.Event()  
+        task = asyncio.create_task(probe(done))  
+        started = time.perf_counter()  
+        results = await asyncio.gather(*(db.whitelist_user(str(i), f'user{i}', 1) for i in range(16)))  
+        elapsed = time.perf_counter() - started  
+        done.set()  
+        return results, elapsed, await task  
+  
+    results, elapsed, lag = run(scenario())  
+    assert all(result['success'] for result in results)  
+    assert elapsed < 16 * 0.05  
+    assert lag < 0.04  
+    assert len(db.active_users) == 16  
+    db.close()  
@@ -0,0 +1,169 @@
+import time  
+import asyncio  
+import types  
+from collections import defaultdict  
+import discord  
+import pytest  
+import bot  
+from tests.replay import user_payload, snowflakes  
+  
+DM_USER_BASE = 800000000000000000  
+  
+class DMServer:  
+    def __init__(self, replay, monkeypatch):  
+        self.replay = replay  
+        self.channels = {}  
+        self.sent = defaultdict(list)  
+        self.contents = defaultdict(list)  
+        self.failures = {}  
+        monkeypatch.setitem(replay.http.handlers, ('POST', '/users/@me/channels'), self.create_dm)  
+        monkeypatch.setitem(replay.http.handlers, ('POST', '/channels/{channel_id}/messages'), self.send)  
+  
+    def user(self, user_id: int) -> discord.User:  
+        return self.replay.bot._connection.store_user(user_payload(user_id))  
+  
+    def fail(self, user_id: int, status: int, times: int, after: int = 0):  
+        self.failures[user_id] = [status, times, after]  
+  
+    def create_dm(self, route, json, **kwargs):  
+        channel_id = next(snowflakes)  
+        self.channels[channel_id] = int(json['recipient_id'])  
+        return {'id': str(channel_id), 'type': 1, 'recipients': [user_payload(int(json['recipient_id']))], 'last_message_id': None}  
+  
+    def send(self, route, json=None, **kwargs):  
+        user_id = self.channels[route.channel_id]  
+        failure = self.failures.get(user_id)  
+        if failure and failure[1] and len(self.sent.get(user_id, ())) >= failure[2]:  
+            failure[1] -= 1  
+            response = types.SimpleNamespace(status=failure[0], reason='Forbidden' if failure[0] == 403 else 'Error')  
+            if failure[0] == 403:  
+                raise discord.Forbidden(response, {'code': 50007, 'message': 'Cannot send messages to this user'})  
+            raise discord.HTTPException(response, {'code': 0, 'message': 'rate limited' if failure[0] == 429 else 'server error'})  
+        self.sent[user_id].append(time.monotonic())  
+        self.contents[user_id].append((json or {}).get('content'))  
+        return {'id': str(next(snowflakes)), 'channel_id': str(route.channel_id), 'author': user_payload(1), 'content': (json or {}).get('content', ''),  
+                'timestamp': '2024-01-01T00:00:00+00:00', 'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': [],  
+                'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0, 'flags': 0}  
+  
+@pytest.fixture  
+def server(replay, monkeypatch):  
+    return DMServer(replay, monkeypatch)  
+  
+@pytest.fixture  
+def backoffs(monkeypatch):  
+    delays = []  
+    sleep = asyncio.sleep  
+  
+    async def fast_sleep(delay, result=None):  
+        if delay >= 1:  
+            delays.append(delay)  
+            delay = 0  
+        return await sleep(delay, result)  
+  
+    monkeypatch.setattr(bot.asyncio, 'sleep', fast_sleep)  
+    return delays  
+  
+def test_token_bucket_reserve_spaces_out_callers(monkeypatch):  
+    now = [1000.0]  
+    monkeypatch.setattr(bot.time, 'monotonic', lambda: now[0])  
+    bucket = bot.TokenBucket(rate=10, capacity=3)  
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]  
+    assert [round(bucket.reserve(), 3) for _ in range(3)] == [0.1, 0.2, 0.3]  
+    now[0] += 0.3  
+    assert bucket.reserve() == pytest.approx(0.1)  
+  
+def test_token_bucket_try_acquire(monkeypatch):  
+    now = [1000.0]  
+    monkeypatch.setattr(bot.time, 'monotonic', lambda: now[0])  
+    bucket = bot.TokenBucket(rate=1, capacity=2)  
+    assert bucket.try_acquire() and bucket.try_acquire()  
+    assert not bucket.try_acquire()  
+    now[0] += 1  
+    assert bucket.try_acquire()  
+    assert not bucket.try_acquire()  
+    now[0] += 100  
+    assert bucket.tokens <= bucket.capacity  
+    assert bucket.try_acquire() and bucket.try_acquire()  
+    assert not bucket.try_acquire()  
+  
+def test_dm_load_respects_rate_limits(run, server, backoffs):  
+    rate, burst, user_rate, user_burst = 400.0, 20, 20.0, 2  
+    dms = bot.DMDispatcher(workers=16, max_queue=2000, rate=rate, burst=burst, user_rate=user_rate, user_burst=user_burst)  
+    users = [server.user(DM_USER_BASE + i) for i in range(100)]  
+    forbidden, flaky, limited = users[0], users[1], users[2]  
+    server.fail(forbidden.id, 403, 100)  
+    server.fail(flaky.id, 500, 1)  
+    server.fail(limited.id, 429, 100)  
+    reports = defaultdict(list)  
+  
+    def report_for(user_id):  
+        async def report(delivered):  
+            reports[user_id].append(delivered)  
+        return report  
+  
+    async def scenario():  
+        dms.start()  
+        started = time.monotonic()  
+        for _ in range(4):  
+            for user in users:  
+                await dms.submit(user, lambda: [{'content': 'hello'}], report_for(user.id))  
+        await dms.queue.join()  
+        elapsed = time.monotonic() - started  
+        await dms.stop()  
+        return elapsed  
+  
+    elapsed = run(scenario())  
+    delivered = sum(len(times) for times in server.sent.values())  
+    assert delivered == 4 * 97 + 4  
+    assert elapsed >= (delivered - burst) / rate * 0.9  
+  
+    assert reports[forbidden.id] == [False] * 4  
+    assert reports[limited.id] == [False] * 4  
+    assert reports[flaky.id] == [True] * 4  
+    assert all(reports[user.id] == [True] * 4 for user in users[3:])  
+  
+    letters = list(dms.dead_letters)  
+    assert sum(1 for letter in letters if letter['userId'] == str(forbidden.id)) == 4  
+    assert all(letter['attempts'] == 1 for letter in letters if letter['userId'] == str(forbidden.id))  
+    assert all(letter['attempts'] == dms.max_attempts for letter in letters if letter['userId'] == str(limited.id))  
+    assert len(backoffs) == 4 * (dms.max_attempts - 1) + 1  
+    assert all(1 <= delay <= 30.5 for delay in backoffs)  
+  
+    for times in server.sent.values():  
+        assert times[user_burst] - times[0] >= (4 - user_burst - 1) / user_rate * 0.9  
+  
+def test_dm_queue_is_bounded(run, server):  
+    dms = bot.DMDispatcher(max_queue=5)  
+    reports = []  
+  
+    async def report(delivered):  
+        reports.append(delivered)  
+  
+    async def scenario():  
+        for i in range(8):  
+            await dms.submit(server.user(DM_USER_BASE + i), lambda: [{'content': 'hello'}], report)  
+  
+    run(scenario())  
+    assert dms.queue.qsize() == 5  
+    assert reports == [False] * 3  
+    assert [letter['error'] for letter in dms.dead_letters] == ['queue full'] * 3  
+  
+def test_dm_retry_resumes_after_sent_messages(run, server, backoffs):  
+    dms = bot.DMDispatcher(workers=1)  
+    user = server.user(DM_USER_BASE + 500)  
+    server.fail(user.id, 500, 1, after=1)  
+    reports = []  
+  
+    async def report(delivered):  
+        reports.append(delivered)  
+  
+    async def scenario():  
+        dms.start()  
+        await dms.submit(user, lambda: [{'content': f'part {i}'} for i in range(1, 4)], report)  
+        await dms.queue.join()  
+        await dms.stop()  
+  
+    run(scenario())  
+    assert server.contents[user.id] == ['part 1', 'part 2', 'part 3']  
+    assert reports == [True]  
+    assert len(backoffs) == 1  
@@ -0,0 +1,164 @@
+import itertools  
+from discord import app_commands  
+from tests.replay import OWNER_ID, MANAGER_ROLE_ID  
+  
+user_ids = itertools.count(700000000000000000)  
+  
+def new_user() -> int:  
+    return next(user_ids)  
+  
+def test_listkeys_filters_by_status(replay, run):  
+    run(replay.slash('createkey', OWNER_ID, code='LIST-UNUSED-1', days=7))  
+    run(replay.modal('redeem_key_modal', new_user(), {'key_input': 'LIST-UNUSED-1'}))  
+    reply = run(replay.slash('listkeys', OWNER_ID, status=app_commands.Choice(name='Redeemed', value='redeemed')))  
+    total = run(replay.bot.db.count_keys('redeemed'))  
+    embed = reply.embeds[0]  
+    assert embed['footer']['text'].endswith(f'of {total} keys')  
+    assert 'unused' not in embed['description']  
+  
+def test_listkeys_requires_manager(replay, run):  
+    reply = run(replay.slash('listkeys', new_user()))  
+    assert 'Manager role' in reply.content  
+  
+def test_genkeys_delivers_keys_by_dm(replay, run):  
+    recipient = new_user()  
+    sent = replay.http.count('POST', '/channels/{channel_id}/messages')  
+    run(replay.slash('genkeys', OWNER_ID, user=recipient, amount=25, days=3))  
+    run(replay.drain())  
+    assert replay.http.count('POST', '/channels/{channel_id}/messages') == sent + 1  
+    assert run(replay.bot.db.count_keys(created_by=f'user{OWNER_ID}')) >= 25  
+  
+def test_genkeys_reports_delivery(replay, run):  
+    reply = run(replay.slash('genkeys', OWNER_ID, user=new_user(), amount=3))  
+    run(replay.drain())  
+    assert reply.responses[0][2]['type'] == 5  
+    assert 'Successfully generated and sent **3** keys' in reply.text  
+  
+def test_panel_buttons_require_login(replay, run):  
+    for custom_id in ('get_stats', 'get_script'):  
+        reply = run(replay.button(custom_id, new_user()))  
+        assert 'Authentication Required' in reply.content  
+  
+def test_redeem_key_flow(replay, run):  
+    user_id = new_user()  
+    run(replay.slash('createkey', OWNER_ID, code='FLOW-KEY-1', days=1))  
+  
+    reply = run(replay.button('redeem_key', user_id))  
+    assert reply.responses[0][2]['type'] == 9  
+  
+    reply = run(replay.modal('redeem_key_modal', user_id, {'key_input': 'FLOW-KEY-1'}))  
+    assert 'Key Redeemed Successfully' in reply.text  
+  
+    reply = run(replay.button('get_stats', user_id))  
+    assert 'Your Status: ✅ Active' in reply.content  
+  
+    reply = run(replay.button('get_script', user_id))  
+    run(replay.drain())  
+    assert 'Script sent to your DMs' in reply.text  
+  
+def test_lapsed_user_redeems_a_new_key(replay, run):  
+    user_id = new_user()  
+    run(replay.slash('createkey', OWNER_ID, code='LAPSE-KEY-1', days=1))  
+    run(replay.slash('createkey', OWNER_ID, code='LAPSE-KEY-2', days=1))  
+    reply = run(replay.modal('redeem_key_modal', user_id, {'key_input': 'LAPSE-KEY-1'}))  
+    assert 'Key Redeemed Successfully' in reply.text  
+  
+    database = replay.bot.db.db  
+    database.users[str(user_id)]['expiresAt'] = database.sessions[str(user_id)] = 0  
+    run(replay.bot.db.expire([('whitelist', str(user_id))]))  
+    reply = run(replay.button('redeem_key', user_id))  
+    assert reply.responses[0][2]['type'] == 9  
+    reply = run(replay.modal('redeem_key_modal', user_id, {'key_input': 'LAPSE-KEY-2'}))  
+    assert 'Key Redeemed Successfully' in reply.text  
+  
+def test_redeem_key_modal_rejects_unknown_key(replay, run):  
+    reply = run(replay.modal('redeem_key_modal', new_user(), {'key_input': 'NOPE-NOPE-NOPE'}))  
+    assert reply.content.startswith('❌')  
+  
+def test_redeem_key_modal_rejects_used_key(replay, run):  
+    run(replay.slash('createkey', OWNER_ID, code='USED-KEY-1', days=1))  
+    run(replay.modal('redeem_key_modal', new_user(), {'key_input': 'USED-KEY-1'}))  
+    reply = run(replay.modal('redeem_key_modal', new_user(), {'key_input': 'USED-KEY-1'}))  
+    assert reply.content.startswith('❌')  
+  
+def test_manager_role_grants_commands(replay, run):  
+    manager = new_user()  
+    reply = run(replay.slash('listkeys', manager, roles=(MANAGER_ROLE_ID,)))  
+    assert 'Authentication Required' in reply.content  
+  
+def test_panel_reply_keeps_persistent_view_alive(replay, run):  
+    user_id = new_user()  
+    run(replay.slash('createkey', OWNER_ID, code='PANEL-KEY-1', days=1))  
+    run(replay.modal('redeem_key_modal', user_id, {'key_input': 'PANEL-KEY-1'}))  
+  
+    store = replay.bot._connection._view_store  
+    stored = sum(map(len, store._views.values())), len(store._synced_message_views)  
+    reply = run(replay.slash('panel', user_id))  
+    assert 'User Control Panel' in reply.text  
+    assert {button['custom_id'] for row in reply.messages[0]['components'] for button in row['components']} >= {'get_script', 'redeem_key'}  
+    assert (sum(map(len, store._views.values())), len(store._synced_message_views)) == stored  
+    assert replay.bot.panel_view.timeout is None  
+    assert not replay.bot.panel_view.is_finished()  
+  
+    reply = run(replay.button('get_stats', user_id))  
+    assert 'Your Status: ✅ Active' in reply.content  
+  
+def test_panel_metrics_include_interaction_check(replay, run):  
+    user_id = new_user()  
+    run(replay.slash('createkey', OWNER_ID, code='METRICS-KEY-1', days=1))  
+    run(replay.modal('redeem_key_modal', user_id, {'key_input': 'METRICS-KEY-1'}))  
+    metrics = replay.module.metrics  
+    db_calls = metrics.db_calls['PanelView.get_stats']  
+    count = metrics.handlers['PanelView.get_stats'].count  
+  
+    run(replay.button('get_stats', user_id))  
+    assert metrics.db_calls['PanelView.get_stats'] > db_calls  
+    assert metrics.handlers['PanelView.get_stats'].count == count + 1  
+  
+    run(replay.button('get_stats', new_user()))  
+    assert metrics.handlers['PanelView.get_stats'].count == count + 2  
+  
+def test_interaction_responses_are_timed_per_route(replay, run):  
+    metrics = replay.module.metrics  
+    route = 'POST /interactions/{webhook_id}/{webhook_token}/callback'  
+    count = metrics.routes[route].count  
+    api_seconds = metrics.api_seconds['PanelView.get_stats']  
+  
+    run(replay.button('get_stats', new_user()))  
+    assert metrics.routes[route].count == count + 1  
+    assert metrics.api_seconds['PanelView.get_stats'] > api_seconds  
+  
+def attachment(filename: str = 'users.csv') -> dict:  
+    return {'id': str(new_user()), 'filename': filename, 'size': 1024, 'url': 'https://cdn.example.invalid/users.csv', 'proxy_url': 'https://cdn.example.invalid/users.csv'}  
+  
+def csv_rows(*rows, error: Exception = None):  
+    async def iter_csv_rows(attachment):  
+        for line_number, row in enumerate(rows, 1):  
+            yield line_number, row  
+        if error:  
+            raise error  
+  
+    return iter_csv_rows  
+  
+def test_whitelist_bulk_imports_rows(replay, run, monkeypatch):  
+    users = [str(new_user()) for _ in range(3)]  
+    monkeypatch.setattr(replay.module, 'iter_csv_rows', csv_rows(['user_id', 'days'], *([user_id, '7'] for user_id in users), ['bad', '7']))  
+    reply = run(replay.slash('whitelist-bulk', OWNER_ID, file=attachment()))  
+    assert reply.messages[-1]['content'].startswith('✅ Whitelisted **3** users')  
+    assert '**1** rows failed' in reply.messages[-1]['content']  
+    assert all(user_id in replay.bot.db.active_users for user_id in users)  
+  
+def test_whitelist_bulk_reports_line_too_long(replay, run, monkeypatch):  
+    monkeypatch.setattr(replay.module, 'BULK_BATCH_SIZE', 1)  
+    monkeypatch.setattr(replay.module, 'iter_csv_rows', csv_rows([str(new_user()), '7'], error=ValueError('Line is too long')))  
+    reply = run(replay.slash('whitelist-bulk', OWNER_ID, file=attachment()))  
+    assert reply.messages[-1]['content'].startswith('❌ Could not read **users.csv**: Line is too long. 1 rows were applied')  
+  
+def test_blacklist_bulk_reports_apply_failure(replay, run, monkeypatch):  
+    async def broken(rows):  
+        raise RuntimeError('database unavailable')  
+  
+    monkeypatch.setattr(replay.module, 'iter_csv_rows', csv_rows([str(new_user()), '0', 'spam']))  
+    monkeypatch.setattr(replay.bot.db, 'blacklist_users_bulk', broken)  
+    reply = run(replay.slash('blacklist-bulk', OWNER_ID, file=attachment()))  
+    assert reply.messages[-1]['content'].startswith('❌ Importing **users.csv** failed. 0 rows were applied')  
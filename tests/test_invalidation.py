@@ -0,0 +1,70 @@
+import json  
+import bot  
+from tests.fakes import FakeDatabase  
+  
+class LocalBus(bot.InvalidationBus):  
+    def __init__(self, peers: list):  
+        super().__init__()  
+        self.peers = peers  
+        peers.append(self)  
+  
+    async def publish(self, message: dict):  
+        data = json.dumps({**message, 'origin': self.origin})  
+        for peer in self.peers:  
+            message = json.loads(data)  
+            if peer.handler and message.get('origin') != peer.origin:  
+                await peer.handler(message)  
+  
+def shards(run, database, count: int = 3) -> list:  
+    peers = []  
+    dbs = [bot.AsyncDatabase(database, bus=LocalBus(peers)) for _ in range(count)]  
+    for db in dbs:  
+        async def handler(message, db=db):  
+            db.apply(message)  
+  
+        run(db.bus.start(handler))  
+    return dbs  
+  
+def test_owner_invalidation_fans_out_to_every_shard(run):  
+    database = FakeDatabase()  
+    dbs = shards(run, database)  
+    assert not any(run(db.is_owner('1')) for db in dbs)  
+  
+    run(dbs[0].add_owner('1', 'user1', 'owner'))  
+    assert all(run(db.is_owner('1')) for db in dbs)  
+  
+    run(dbs[2].remove_owner('1', 'user1', 'owner'))  
+    assert not any(run(db.is_owner('1')) for db in dbs)  
+    for db in dbs:  
+        db.close()  
+  
+def test_session_invalidation_fans_out_to_every_shard(run):  
+    database = FakeDatabase()  
+    dbs = shards(run, database)  
+    assert not any(run(db.is_logged_in('1')) for db in dbs)  
+  
+    api_key = run(dbs[1].create_api_key('manager', '1'))['apiKey']['apiKey']  
+    assert run(dbs[1].login_with_api_key('1', 'user1', api_key))['success']  
+    assert all(run(db.is_logged_in('1')) for db in dbs)  
+  
+    database.users['1'] = {'userId': '1', 'username': 'user1', 'status': 'active', 'expiresAt': 0, 'hwid': None}  
+    database.sessions['1'] = 0  
+    run(dbs[0].expire([('whitelist', '1')]))  
+    assert not any(run(db.is_logged_in('1')) for db in dbs)  
+    for db in dbs:  
+        db.close()  
+  
+def test_index_updates_fan_out_to_every_shard(run):  
+    database = FakeDatabase()  
+    dbs = shards(run, database)  
+    for db in dbs:  
+        run(db.load_indexes())  
+  
+    run(dbs[0].create_keys_bulk(['FANOUT-1', 'FANOUT-2'], 1, 'manager'))  
+    assert all(run(db.count_keys(bot.KEY_STATUS_UNUSED)) == 2 for db in dbs)  
+  
+    assert run(dbs[1].redeem_key('1', 'user1', 'FANOUT-1'))['success']  
+    assert all(run(db.count_keys(bot.KEY_STATUS_REDEEMED)) == 1 for db in dbs)  
+    assert all('1' in db.active_users for db in dbs)  
+    for db in dbs:  
+        db.close()  
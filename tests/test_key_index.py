@@ -0,0 +1,60 @@
+import bot  
+from tests.fakes import FakeDatabase  
+  
+def build_index(size: int) -> bot.KeyIndex:  
+    index = bot.KeyIndex()  
+    index.load([  
+        {'code': f'KEY-{i:06d}', 'status': bot.KEY_STATUS_REDEEMED if i % 3 == 0 else bot.KEY_STATUS_UNUSED, 'duration': i % 30, 'createdBy': f'manager{i % 4}', 'createdAt': i}  
+        for i in range(size)  
+    ])  
+    return index  
+  
+def test_key_index_counts_by_status_and_creator():  
+    index = build_index(300)  
+    assert index.count() == 300  
+    assert index.count(bot.KEY_STATUS_REDEEMED) == 100  
+    assert index.count(created_by='manager1') == 75  
+    assert index.count(bot.KEY_STATUS_REDEEMED, 'manager0') == 25  
+    assert index.status_counts() == {bot.KEY_STATUS_UNUSED: 200, bot.KEY_STATUS_REDEEMED: 100}  
+  
+def test_key_index_set_status_moves_counters():  
+    index = build_index(10)  
+    index.set_status('KEY-000001', bot.KEY_STATUS_EXPIRED)  
+    index.set_status('KEY-000001', bot.KEY_STATUS_EXPIRED)  
+    index.set_status('MISSING-KEY', bot.KEY_STATUS_EXPIRED)  
+    assert index.status_counts() == {bot.KEY_STATUS_UNUSED: 5, bot.KEY_STATUS_REDEEMED: 4, bot.KEY_STATUS_EXPIRED: 1}  
+    assert index.page(bot.KEY_STATUS_EXPIRED)['keys'] == [{'code': 'KEY-000001', 'status': bot.KEY_STATUS_EXPIRED, 'duration': 1, 'createdBy': 'manager1'}]  
+  
+def test_key_index_pages_with_cursor():  
+    index = build_index(100)  
+    seen = []  
+    cursor = None  
+    while True:  
+        page = index.page(bot.KEY_STATUS_UNUSED, cursor=cursor, limit=25)  
+        seen.extend(key['code'] for key in page['keys'])  
+        cursor = page['nextCursor']  
+        if cursor is None:  
+            break  
+    assert len(seen) == len(set(seen)) == index.count(bot.KEY_STATUS_UNUSED)  
+  
+def test_key_index_ignores_duplicate_codes():  
+    index = build_index(5)  
+    index.add('KEY-000000', bot.KEY_STATUS_UNUSED, 1, 'someone')  
+    assert index.count() == 5  
+    assert index.find('KEY-000000') == 0  
+  
+def test_expiry_marks_redeemed_key_expired(run):  
+    database = FakeDatabase()  
+    database.create_key('EXPIRE-ME', 1, 'manager')  
+    database.redeem_key('1', 'user1', 'EXPIRE-ME')  
+    db = bot.AsyncDatabase(database)  
+    run(db.load_indexes())  
+    assert db.keys.status_counts() == {bot.KEY_STATUS_REDEEMED: 1}  
+  
+    database.users['1']['expiresAt'] = 0  
+    lapsed = run(db.expire([('whitelist', '1')]))  
+    assert lapsed == ['1']  
+    assert db.keys.status_counts() == {bot.KEY_STATUS_EXPIRED: 1}  
+    assert run(db.count_keys(bot.KEY_STATUS_EXPIRED)) == 1  
+    assert '1' not in db.active_users  
+    db.close()  
@@ -0,0 +1,44 @@
+import os  
+import time  
+import inspect  
+import discord  
+import bot  
+  
+OVERHEAD_BUDGET = 50e-6  
+  
+async def measure(func, rounds: int) -> float:  
+    started = time.perf_counter()  
+    for _ in range(rounds):  
+        await func()  
+    return (time.perf_counter() - started) / rounds  
+  
+def test_instrumentation_overhead_within_budget(run):  
+    metrics = bot.Metrics()  
+    route = discord.http.Route('POST', '/interactions/{webhook_id}/{webhook_token}/callback', webhook_id=1, webhook_token='token')  
+  
+    async def request(route, *args, **kwargs):  
+        return None  
+  
+    timed_request = metrics.timed_request(request)  
+    assert metrics.timed_request(timed_request) is timed_request  
+  
+    async def handler():  
+        await request(route)  
+        await request(route)  
+  
+    @metrics.instrument  
+    async def instrumented():  
+        await timed_request(route)  
+        await timed_request(route)  
+  
+    overhead = min(run(measure(instrumented, 2000)) - run(measure(handler, 2000)) for _ in range(5))  
+    assert overhead < OVERHEAD_BUDGET  
+    assert metrics.handlers[instrumented.__qualname__].count == 10000  
+    assert metrics.routes[f'{route.method} {route.path}'].count == 20000  
+  
+def test_panel_scope_hook_matches_pinned_discord_py():  
+    with open(os.path.join(os.path.dirname(__file__), '..', 'requirements.txt.txt'), encoding='utf-8') as f:  
+        pinned = f.read()  
+    assert f'discord.py=={discord.__version__}' in pinned.split()  
+    assert inspect.iscoroutinefunction(discord.ui.View._scheduled_task)  
+    assert list(inspect.signature(discord.ui.View._scheduled_task).parameters) == ['self', 'item', 'interaction']  
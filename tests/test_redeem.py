@@ -0,0 +1,110 @@
+import time  
+import asyncio  
+import itertools  
+import bot  
+from tests.fakes import FakeDatabase  
+  
+REDEEM_USER_BASE = 750000000000000000  
+  
+class RacyDatabase(FakeDatabase):  
+    def redeem_key(self, user_id, username, code):  
+        self.redeem_calls += 1  
+        key = self.keys.get(code)  
+        if not key:  
+            return {'success': False, 'error': 'Invalid key'}  
+        if key['status'] != 'unused':  
+            return {'success': False, 'error': 'Key already redeemed'}  
+        time.sleep(0.0001)  
+        key['status'] = 'redeemed'  
+        key['redeemedBy'] = user_id  
+        self.keys_by_user[user_id] = code  
+        self.users[user_id] = {'userId': user_id, 'username': username, 'status': 'active', 'expiresAt': self.now() + 86400000, 'hwid': None}  
+        self.sessions[user_id] = self.now() + 86400000  
+        return {'success': True}  
+  
+    @classmethod  
+    def with_keys(cls, size: int):  
+        db = cls()  
+        db.redeem_calls = 0  
+        for i in range(size):  
+            db.create_key(f'RACE-{i:04d}', 1, 'manager')  
+        return db  
+  
+def test_concurrent_redeems_succeed_once_per_key(replay, run):  
+    database = RacyDatabase.with_keys(100)  
+    previous = run(replay.load_dataset(database, workers=16))  
+    codes = itertools.cycle(sorted(database.keys))  
+    users = [REDEEM_USER_BASE + i for i in range(1000)]  
+  
+    async def scenario():  
+        return await asyncio.gather(*(replay.modal('redeem_key_modal', user_id, {'key_input': next(codes)}) for user_id in users))  
+  
+    try:  
+        replies = run(scenario())  
+        successes = [reply for reply in replies if 'Key Redeemed Successfully' in reply.text]  
+        assert len(successes) == 100  
+        assert sum('Key already redeemed' in reply.text for reply in replies) == 900  
+        assert all(key['status'] == 'redeemed' for key in database.keys.values())  
+        assert len({key['redeemedBy'] for key in database.keys.values()}) == 100  
+        assert len(database.users) == 100  
+        assert run(replay.bot.db.count_keys(bot.KEY_STATUS_REDEEMED)) == 100  
+        assert run(replay.bot.db.count_keys(bot.KEY_STATUS_UNUSED)) == 0  
+    finally:  
+        replay.restore(previous)  
+  
+def test_concurrent_redeems_by_one_user_succeed_once(run):  
+    database = RacyDatabase.with_keys(10)  
+    db = bot.AsyncDatabase(database, workers=8)  
+    results = run(asyncio.gather(*(db.redeem_key('1', 'user1', code) for code in database.keys)))  
+    assert sum(result['success'] for result in results) == 1  
+    assert len(database.users) == 1  
+    db.close()  
+  
+def test_duplicate_submits_share_one_redeem(run):  
+    database = RacyDatabase.with_keys(1)  
+    db = bot.AsyncDatabase(database, workers=8)  
+    results = run(asyncio.gather(*(db.redeem_key('1', 'user1', 'RACE-0000') for _ in range(50))))  
+    assert all(result['success'] for result in results)  
+    assert database.redeem_calls == 1  
+    assert not db.inflight  
+  
+    assert not run(db.redeem_key('1', 'user1', 'RACE-0000'))['success']  
+    db.close()  
+  
+def test_expiry_scheduler_returns_due_entries_in_order(run):  
+    scheduler = bot.ExpiryScheduler(batch_size=2)  
+    now = bot.now_ms()  
+    scheduler.load([('whitelist', 'c', now - 10), ('whitelist', 'a', now - 30)])  
+    scheduler.schedule('blacklist', 'b', now - 20)  
+    scheduler.schedule('whitelist', 'later', now + 60000)  
+    assert len(scheduler) == 4  
+  
+    assert run(scheduler.next_batch()) == [('whitelist', 'a'), ('blacklist', 'b')]  
+    assert run(scheduler.next_batch()) == [('whitelist', 'c')]  
+    assert len(scheduler) == 1  
+  
+def test_expiry_scheduler_cancel_and_reschedule(run):  
+    scheduler = bot.ExpiryScheduler()  
+    now = bot.now_ms()  
+    scheduler.schedule('whitelist', 'a', now - 10)  
+    scheduler.schedule('whitelist', 'b', now - 10)  
+    scheduler.cancel('whitelist', 'a')  
+    scheduler.schedule('whitelist', 'c', now - 10)  
+    scheduler.schedule('whitelist', 'c', now + 60000)  
+    assert run(scheduler.next_batch()) == [('whitelist', 'b')]  
+    assert len(scheduler) == 1  
+  
+def test_expiry_scheduler_wakes_for_earlier_deadline(run):  
+    scheduler = bot.ExpiryScheduler()  
+    scheduler.schedule('whitelist', 'late', bot.now_ms() + 60000)  
+  
+    async def scenario():  
+        task = asyncio.create_task(scheduler.next_batch())  
+        await asyncio.sleep(0.01)  
+        assert not task.done()  
+        scheduler.schedule('whitelist', 'soon', bot.now_ms() + 20)  
+        return await asyncio.wait_for(task, 1)  
+  
+    started = time.monotonic()  
+    assert run(scenario()) == [('whitelist', 'soon')]  
+    assert time.monotonic() - started < 1  
@@ -0,0 +1,81 @@
+import types  
+import logging  
+import discord  
+import pytest  
+import bot  
+from tests.replay import BUYER_ROLE_ID, member_payload  
+  
+ROLE_PATH = '/guilds/{guild_id}/members/{user_id}/roles/{role_id}'  
+  
+@pytest.fixture  
+def members(replay, monkeypatch):  
+    listing = []  
+  
+    def get_members(route, params=None, **kwargs):  
+        after = int(params.get('after') or 0)  
+        page = [data for data in listing if int(data['user']['id']) > after]  
+        return page[:params['limit']]  
+  
+    monkeypatch.setitem(replay.http.handlers, ('GET', '/guilds/{guild_id}/members'), get_members)  
+    monkeypatch.setattr(replay.bot.roles, 'listed_at', {})  
+    monkeypatch.setattr(replay.bot.roles, 'can_list_members', True)  
+    return listing  
+  
+def role_calls(calls: list, method: str) -> set:  
+    return {int(call[2].url.split('/members/')[1].split('/')[0]) for call in calls if call[0] == method and call[1] == ROLE_PATH}  
+  
+def test_reconcile_uses_real_holders_without_members_intent(replay, run, members, monkeypatch):  
+    calls = len(replay.http.calls)  
+    members.extend([member_payload(11), member_payload(12, [BUYER_ROLE_ID]), member_payload(14, [BUYER_ROLE_ID])])  
+    future = bot.now_ms() + 86400000  
+    monkeypatch.setattr(replay.bot.db, 'active_users', {'11': future, '12': future, '13': future})  
+    monkeypatch.setattr(replay.bot.roles.bucket, 'rate', 1e9)  
+  
+    run(replay.bot.roles.reconcile(replay.guild))  
+    run(replay.drain())  
+    assert role_calls(replay.http.calls[calls:], 'PUT') == {11}  
+    assert role_calls(replay.http.calls[calls:], 'DELETE') == {14}  
+  
+def test_reconcile_after_restart_pages_members(replay, run, members, monkeypatch):  
+    calls = len(replay.http.calls)  
+    holders = range(1, 2501)  
+    members.extend(member_payload(user_id, [BUYER_ROLE_ID]) for user_id in holders)  
+    future = bot.now_ms() + 86400000  
+    monkeypatch.setattr(replay.bot.db, 'active_users', {str(user_id): future for user_id in holders})  
+  
+    run(replay.bot.roles.reconcile(replay.guild))  
+    assert replay.bot.roles.queue.empty()  
+    assert sum(1 for call in replay.http.calls[calls:] if call[1] == '/guilds/{guild_id}/members') == 3  
+  
+def member_list_calls(calls: list) -> int:  
+    return sum(1 for call in calls if call[1] == '/guilds/{guild_id}/members')  
+  
+def test_reconcile_lists_members_once_per_interval(replay, run, members, monkeypatch):  
+    calls = len(replay.http.calls)  
+    members.append(member_payload(11))  
+    run(replay.bot.roles.reconcile(replay.guild))  
+    run(replay.bot.roles.reconcile(replay.guild))  
+    assert member_list_calls(replay.http.calls[calls:]) == 1  
+  
+    monkeypatch.setattr(replay.bot.roles, 'list_interval', 0)  
+    run(replay.bot.roles.reconcile(replay.guild))  
+    assert member_list_calls(replay.http.calls[calls:]) == 2  
+  
+def test_reconcile_without_members_intent_falls_back_to_expiry(replay, run, members, monkeypatch, caplog):  
+    def forbidden(route, **kwargs):  
+        raise discord.Forbidden(types.SimpleNamespace(status=403, reason='Forbidden'), {'code': 50001, 'message': 'Missing Access'})  
+  
+    monkeypatch.setitem(replay.http.handlers, ('GET', '/guilds/{guild_id}/members'), forbidden)  
+    monkeypatch.setattr(replay.bot.roles, 'list_interval', 0)  
+    monkeypatch.setattr(replay.bot.roles.bucket, 'rate', 1e9)  
+    calls = len(replay.http.calls)  
+    with caplog.at_level(logging.WARNING, logger='luarmor'):  
+        run(replay.bot.roles.reconcile(replay.guild))  
+        run(replay.bot.roles.reconcile(replay.guild))  
+    assert member_list_calls(replay.http.calls[calls:]) == 1  
+    assert sum('GUILD_MEMBERS' in record.getMessage() for record in caplog.records) == 1  
+    assert replay.bot.roles.queue.empty()  
+  
+    run(replay.bot.roles.revoke(['21']))  
+    run(replay.drain())  
+    assert role_calls(replay.http.calls[calls:], 'DELETE') == {21}  
@@ -0,0 +1,97 @@
+import bot  
+from tests.fakes import FakeDatabase, FakeHashedDatabase  
+  
+def test_lapsed_redeemed_session_is_dropped(run):  
+    database = FakeDatabase()  
+    database.create_key('SESSION-KEY', 1, 'manager')  
+    db = bot.AsyncDatabase(database)  
+    run(db.load_indexes())  
+    assert run(db.redeem_key('1', 'user1', 'SESSION-KEY'))['success']  
+    assert run(db.is_logged_in('1'))  
+  
+    database.users['1']['expiresAt'] = database.sessions['1'] = 0  
+    assert run(db.expire([('whitelist', '1')])) == ['1']  
+    assert not run(db.is_logged_in('1'))  
+    db.close()  
+  
+def test_sessions_invalidation_drops_logged_in(run):  
+    database = FakeDatabase()  
+    database.sessions['1'] = database.now() + 60000  
+    db = bot.AsyncDatabase(database)  
+    assert run(db.is_logged_in('1'))  
+    del database.sessions['1']  
+    assert run(db.is_logged_in('1'))  
+  
+    db.apply({'kind': 'sessions', 'key': '1'})  
+    assert not run(db.is_logged_in('1'))  
+    db.close()  
+  
+def test_logged_in_check_stays_in_memory(run):  
+    database = FakeDatabase()  
+    database.sessions['1'] = database.now() + 60000  
+    db = bot.AsyncDatabase(database)  
+    for _ in range(100):  
+        assert run(db.is_logged_in('1'))  
+    assert database.calls == 1  
+    db.close()  
+  
+def test_hashed_api_key_round_trip(run):  
+    database = FakeHashedDatabase()  
+    db = bot.AsyncDatabase(database, api_key_secret='secret')  
+    api_key = run(db.create_api_key('manager', '1'))['apiKey']['apiKey']  
+    assert len(api_key) == bot.API_KEY_LENGTH  
+    assert api_key not in database.api_key_hashes  
+    assert not run(db.login_with_api_key('2', 'user2', api_key))['success']  
+    assert run(db.login_with_api_key('1', 'user1', api_key))['success']  
+    assert run(db.is_logged_in('1'))  
+    db.close()  
+  
+def test_login_brute_force_is_rate_limited(run):  
+    database = FakeHashedDatabase()  
+    db = bot.AsyncDatabase(database, api_key_secret='secret')  
+    results = [run(db.login_with_api_key('1', 'user1', 'x' * bot.API_KEY_LENGTH)) for _ in range(1000)]  
+    assert not any(result['success'] for result in results)  
+    assert database.calls == 2 * bot.LOGIN_ATTEMPTS_PER_MINUTE  
+    assert results[-1]['error'].startswith('Too many login attempts')  
+  
+    results = [run(db.login_with_api_key('2', 'user2', 'short')) for _ in range(100)]  
+    assert database.calls == 2 * bot.LOGIN_ATTEMPTS_PER_MINUTE  
+    db.close()  
+  
+def test_plaintext_api_key_migrates_to_hash(run):  
+    database = FakeHashedDatabase()  
+    api_key = 'p' * bot.API_KEY_LENGTH  
+    database.api_keys[api_key] = '1'  
+    db = bot.AsyncDatabase(database, api_key_secret='secret')  
+    assert not run(db.login_with_api_key('2', 'user2', api_key))['success']  
+    assert not database.api_key_hashes  
+  
+    assert run(db.login_with_api_key('1', 'user1', api_key))['success']  
+    assert database.api_key_hashes == {bot.hash_api_key(api_key, db.api_key_secret): '1'}  
+  
+    database.api_keys.clear()  
+    calls = database.calls  
+    assert run(db.login_with_api_key('1', 'user1', api_key))['success']  
+    assert database.calls == calls + 1  
+    db.close()  
+  
+def test_lapsed_user_can_redeem_again(run):  
+    database = FakeDatabase()  
+    database.create_key('LAPSE-1', 1, 'manager')  
+    database.create_key('LAPSE-2', 1, 'manager')  
+    db = bot.AsyncDatabase(database)  
+    run(db.load_indexes())  
+    assert run(db.redeem_key('1', 'user1', 'LAPSE-1'))['success']  
+    assert not run(db.redeem_key('1', 'user1', 'LAPSE-2'))['success']  
+  
+    database.users['1']['expiresAt'] = database.sessions['1'] = 0  
+    run(db.expire([('whitelist', '1')]))  
+    result = run(db.redeem_key('1', 'user1', 'LAPSE-2'))  
+    assert result['success'] and result['user']['expiresAt'] > database.now()  
+    assert run(db.is_logged_in('1'))  
+  
+    database.users['1']['expiresAt'] = database.sessions['1'] = 0  
+    database.blacklist_user('1', 'user1', 0, 'abuse')  
+    database.create_key('LAPSE-3', 1, 'manager')  
+    assert not run(db.redeem_key('1', 'user1', 'LAPSE-3'))['success']  
+    db.close()  
@@ -0,0 +1,44 @@
+import pytest  
+import bot  
+from tests.fakes import FakeConfig, FakeDatabase  
+  
+class SharedConfig(FakeConfig):  
+    SHARED_DATABASE = True  
+    INVALIDATION_BUS_URL = 'redis://localhost:6379/0'  
+  
+class AtomicDatabase(FakeDatabase):  
+    def redeem_key_atomic(self, user_id, username, code):  
+        with self.lock:  
+            if self.get_user(user_id):  
+                return {'success': False, 'error': 'You already have an active session. Please wait for it to expire or contact an admin.'}  
+            result = self.redeem_key(user_id, username, code)  
+            return {**result, 'user': self.get_user(user_id)} if result['success'] else result  
+  
+def test_single_process_needs_no_shared_backend():  
+    bot.check_sharding(FakeConfig(), FakeDatabase(), None)  
+  
+def test_shard_ids_require_shared_database_and_bus():  
+    with pytest.raises(RuntimeError, match='SHARED_DATABASE, INVALIDATION_BUS_URL'):  
+        bot.check_sharding(FakeConfig(), AtomicDatabase(), [1])  
+  
+    config = FakeConfig()  
+    config.SHARED_DATABASE = True  
+    with pytest.raises(RuntimeError, match='missing: INVALIDATION_BUS_URL'):  
+        bot.check_sharding(config, AtomicDatabase(), [0, 1])  
+  
+def test_shard_ids_require_atomic_redeem():  
+    with pytest.raises(RuntimeError, match='redeem_key_atomic'):  
+        bot.check_sharding(SharedConfig(), FakeDatabase(), [1])  
+  
+def test_shard_ids_with_shared_backend_start():  
+    bot.check_sharding(SharedConfig(), AtomicDatabase(), [1])  
+  
+def test_atomic_redeem_bypasses_process_lock(run):  
+    database = AtomicDatabase()  
+    database.create_key('ATOMIC-1', 1, 'manager')  
+    db = bot.AsyncDatabase(database)  
+    db.redeem_lock = None  
+    result = run(db.redeem_key('1', 'user1', 'ATOMIC-1'))  
+    assert result['success'] and result['user']['userId'] == '1'  
+    assert not run(db.redeem_key('2', 'user2', 'ATOMIC-1'))['success']  
+    db.close()  
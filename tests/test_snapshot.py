@@ -0,0 +1,121 @@
+import os  
+import threading  
+import bot  
+from tests.fakes import FakeDatabase  
+from tests.test_key_index import build_index  
+  
+def settle(run, db):  
+    run(db.flush_index_log())  
+    while db.compaction:  
+        run(db.compaction)  
+        run(db.flush_index_log())  
+  
+def test_snapshot_round_trip(tmp_dir):  
+    path = os.path.join(tmp_dir, 'index.snapshot')  
+    index = build_index(1000)  
+    index.set_status('KEY-000002', bot.KEY_STATUS_EXPIRED)  
+    active_users = {str(user_id): 1700000000000 + user_id for user_id in range(50)}  
+    bot.save_index_snapshot(path, index, active_users)  
+  
+    loaded, loaded_users, written_at = bot.load_index_snapshot(path)  
+    assert loaded_users == active_users  
+    assert written_at <= bot.now_ms()  
+    assert loaded.status_counts() == index.status_counts()  
+    assert loaded.page(created_by='manager2', limit=1000) == index.page(created_by='manager2', limit=1000)  
+    assert all(loaded.find(f'KEY-{i:06d}') == i for i in range(1000))  
+    assert loaded.find('KEY-999999') is None  
+  
+    loaded.add('NEW-KEY', bot.KEY_STATUS_UNUSED, 1, 'manager0')  
+    loaded.set_status('KEY-000005', bot.KEY_STATUS_REDEEMED)  
+    bot.save_index_snapshot(path, loaded, loaded_users)  
+    reloaded, _, _ = bot.load_index_snapshot(path)  
+    assert reloaded.count() == 1001  
+    assert reloaded.page(bot.KEY_STATUS_REDEEMED, limit=1000) == loaded.page(bot.KEY_STATUS_REDEEMED, limit=1000)  
+  
+def test_snapshot_rejects_foreign_file(tmp_dir):  
+    path = os.path.join(tmp_dir, 'index.snapshot')  
+    with open(path, 'wb') as f:  
+        f.write(b'JUNK' + bytes(64))  
+    db = bot.AsyncDatabase(FakeDatabase(), snapshot_path=path)  
+    assert db.read_snapshot() is None  
+    db.close()  
+  
+def test_warm_start_replays_log(run, tmp_dir):  
+    path = os.path.join(tmp_dir, 'index.snapshot')  
+    database = FakeDatabase()  
+    database.create_key('WARM-1', 1, 'manager')  
+    db = bot.AsyncDatabase(database, snapshot_path=path)  
+    run(db.load_indexes())  
+    run(db.create_key('WARM-2', 1, 'manager'))  
+    settle(run, db)  
+    db.index_log.close()  
+    db.executor.shutdown()  
+  
+    database.keys.clear()  
+    warm = bot.AsyncDatabase(database, snapshot_path=path)  
+    run(warm.load_indexes())  
+    assert warm.keys.count() == 2 and warm.keys.find('WARM-2') is not None  
+    assert warm.index_log_entries == 1  
+    warm.close()  
+  
+def test_index_log_compacts_off_the_loop(run, tmp_dir, monkeypatch):  
+    monkeypatch.setattr(bot, 'INDEX_LOG_COMPACT_AFTER', 5)  
+    threads = []  
+    save_index_snapshot = bot.save_index_snapshot  
+  
+    def recording_save(*args):  
+        threads.append(threading.current_thread())  
+        return save_index_snapshot(*args)  
+  
+    monkeypatch.setattr(bot, 'save_index_snapshot', recording_save)  
+    path = os.path.join(tmp_dir, 'index.snapshot')  
+    db = bot.AsyncDatabase(FakeDatabase(), snapshot_path=path)  
+    run(db.load_indexes())  
+    for i in range(12):  
+        run(db.create_key(f'COMPACT-{i}', 1, 'manager'))  
+    settle(run, db)  
+    assert len(threads) >= 2  
+    assert threading.main_thread() not in threads  
+  
+    snapshot, _, _ = bot.load_index_snapshot(path)  
+    with open(f'{path}.log', encoding='utf-8') as f:  
+        lines = f.readlines()  
+    assert len(lines) < 5  
+    assert snapshot.count() + len(lines) == 12  
+    assert db.keys.count() == 12 and db.keys.snapshot_size == snapshot.count()  
+    assert all(db.keys.find(f'COMPACT-{i}') is not None for i in range(12))  
+    db.close()  
+  
+def test_compaction_keeps_messages_applied_meanwhile(run, tmp_dir, monkeypatch):  
+    monkeypatch.setattr(bot, 'INDEX_LOG_COMPACT_AFTER', 3)  
+    path = os.path.join(tmp_dir, 'index.snapshot')  
+    database = FakeDatabase()  
+    database.create_key('LATE-0', 1, 'manager')  
+    db = bot.AsyncDatabase(database, snapshot_path=path)  
+    run(db.load_indexes())  
+  
+    async def scenario():  
+        for i in range(1, 4):  
+            await db.create_key(f'LATE-{i}', 1, 'manager')  
+        assert db.compaction is not None  
+        await db.broadcast('key_status', 'LATE-0', bot.KEY_STATUS_REDEEMED)  
+        await db.create_key('LATE-4', 1, 'manager')  
+        await db.compaction  
+  
+    run(scenario())  
+    settle(run, db)  
+    assert db.keys.count() == 5  
+    assert db.keys.count(bot.KEY_STATUS_REDEEMED) == 1  
+    db.index_log.close()  
+    db.executor.shutdown()  
+  
+    database.keys.clear()  
+    warm = bot.AsyncDatabase(database, snapshot_path=path)  
+    run(warm.load_indexes())  
+    assert warm.keys.count() == 5  
+    assert warm.keys.count(bot.KEY_STATUS_REDEEMED) == 1  
+    warm.close()  
+  
+def test_shard_path():  
+    assert bot.shard_path('index.snapshot', None) == 'index.snapshot'  
+    assert bot.shard_path('index.snapshot', [3, 2]) == 'index.snapshot.2-3'  